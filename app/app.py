@@ -1,4 +1,6 @@
+import asyncio
 import sys
+import time
 from pathlib import Path
 import os
 
@@ -13,51 +15,111 @@ if str(PROJECT_ROOT) not in sys.path:
 os.environ["CHAINLIT_LANG"] = "en-US"
 
 # -----------------------------
-# OPTIONAL: Ensure Ollama is ready
+# Startup timing
 # -----------------------------
-try:
-    from chatbot.ollama_utils import ensure_ollama_ready
-    ensure_ollama_ready()
-except Exception:
-    # Ollama is optional – fallback will be used in case it isn't
-    pass
+from chatbot.startup import StartupReport
+
+startup = StartupReport()
+
+# -----------------------------
+# OPTIONAL: Ensure Ollama is ready (background)
+# -----------------------------
+# Ollama is optional – fallback will be used in case it isn't. Starting the
+# server / pulling the model no longer blocks the app from coming up.
+from chatbot.ollama_utils import ensure_ollama_ready
+
+startup.background("ollama_bootstrap", ensure_ollama_ready)
 
 # -----------------------------
 # Imports
 # -----------------------------
 import chainlit as cl
+from chainlit.server import app as chainlit_server
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 
 from chatbot.faq_insights import FAQInsights
-from chatbot.loader import MultiDocumentLoader
-from chatbot.chunking import DocumentChunker
+from chatbot.ingestion import IngestionPipeline
 from chatbot.vectorstore import VectorStoreManager
 from chatbot.rag_chain import HRPolicyRAG
+from chatbot.semantic_cache import SemanticCache
+from chatbot.config import config
 from chatbot.history import ChatHistoryStore
 from chatbot.evaluation import RAGEvaluator
+from chatbot.embeddings import get_embedding_service
+from chatbot.context_packer import get_token_counter
+from chatbot.executors import run_cpu, run_io
+from chatbot.metrics import REGISTRY
 
 
 # -----------------------------
 # GLOBAL INITIALIZATION
 # -----------------------------
 
-# Load HR policy documents
-loader = MultiDocumentLoader()
-docs = loader.load_documents()
+# Embedding model loads in parallel with the index; the first query waits
+# for it only if it is still loading
+startup.background("embedding_model", get_embedding_service().warm_up)
 
-# Chunk documents
-chunker = DocumentChunker()
-chunks = chunker.chunk_documents(docs)
+# Tokenizers used to fit retrieved context into each backend's window
+startup.background(
+    "tokenizers",
+    lambda: [get_token_counter(backend) for backend in config.BACKEND_TOKENIZERS],
+)
 
-# Vector store (FAISS)
 vs_manager = VectorStoreManager()
-vectorstore = vs_manager.get_or_create(chunks)
+vectorstore = None
+
+# Fast path: index manifest matches data/hr_policies, skip load + chunk
+with startup.step("manifest_check"):
+    index_is_current = vs_manager.manifest_is_current()
+
+if index_is_current:
+    try:
+        with startup.step("vectorstore_load"):
+            vectorstore = vs_manager.load_current()
+    except Exception as e:
+        print("⚠️ Failed to load existing vectorstore. Rebuilding...")
+        print(e)
+
+if vectorstore is None:
+    # Stream files -> chunks (process pool) -> batched embedding into
+    # FAISS; only new chunks are embedded, deleted ones are removed
+    with startup.step("ingest"):
+        vectorstore = vs_manager.ingest(IngestionPipeline().iter_batches())
+
+# Semantic answer cache, reset whenever the index contents change
+answer_cache = (
+    SemanticCache(fingerprint=vs_manager.manifest.fingerprint())
+    if config.SEMANTIC_CACHE_ENABLED else None
+)
 
 # RAG pipeline (internally uses llm_factory → Ollama OR HuggingFace HF)
-rag = HRPolicyRAG(vectorstore)
+rag = HRPolicyRAG(
+    vectorstore,
+    cache=answer_cache,
+    lexical_index=vs_manager.lexical_index if config.HYBRID_RETRIEVAL else None,
+)
 
 # History storing & evaluation
-history_store = ChatHistoryStore()
-evaluator = RAGEvaluator()
+with startup.step("history_and_evaluation"):
+    history_store = ChatHistoryStore()
+    evaluator = RAGEvaluator()
+
+startup.ready()
+
+# ----------------------------
+# METRICS ENDPOINT (Prometheus text format)
+# ----------------------------
+async def metrics_endpoint(request):
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+# Chainlit registers a catch-all route for its UI, so ours goes first
+chainlit_server.router.routes.insert(
+    0, Route("/metrics", metrics_endpoint, methods=["GET"])
+)
 
 # ----------------------------
 # CHAINLIT EVENTS
@@ -84,8 +146,8 @@ async def start():
     # -------------------------
     # FAQ Insights (from history)
     # -------------------------
-    past_questions = history_store.fetch_all_questions()
-    faq = FAQInsights(past_questions).top_faqs()
+    past_questions = await run_io(history_store.fetch_all_questions)
+    faq = await run_cpu(FAQInsights(past_questions).top_faqs)
 
     if faq:
         faq_text = "📌 **Most Frequently Asked Questions**\n\n"
@@ -105,17 +167,23 @@ async def handle_message(message: cl.Message):
     """
 
     question = message.content
+    started = time.perf_counter()
 
-    # Immediate feedback to UI
-    await cl.Message(content="Thinking...").send()
+    # Immediate feedback to UI (filled token by token below)
+    reply = cl.Message(content="")
+    await reply.send()
 
     # -------------------------
-    # RAG Answer Generation
+    # RAG Answer Generation (streamed)
     # -------------------------
-    response = rag.answer(question)
+    stream = await rag.stream_answer(question)
+
+    async for token in stream:
+        await reply.stream_token(token)
 
-    answer = response["answer"]
-    sources = response.get("sources", [])
+    answer = stream.answer
+    sources = stream.sources
+    latency_ms = (time.perf_counter() - started) * 1000
 
     # -------------------------
     # Reference text for evaluation
@@ -125,28 +193,36 @@ async def handle_message(message: cl.Message):
     )
 
     # -------------------------
-    # MLflow Evaluation
+    # MLflow Evaluation (scored + logged in the background)
     # -------------------------
-    metrics = evaluator.evaluate(
+    pending_metrics = evaluator.submit(
         question=question,
         answer=answer,
         reference_text=reference_text,
-        model_backend="auto_ollama_or_hf",
+        model_backend=stream.backend,
     )
 
     # -------------------------
-    # Storing chat history
+    # Storing chat history (queued; group-committed by a writer thread)
     # -------------------------
-    history_store.log(question, answer)
+    history_store.log(
+        question,
+        answer,
+        backend=stream.backend,
+        latency_ms=latency_ms,
+        source_ids=[doc.metadata.get("chunk_id") for doc in sources],
+    )
 
     # -------------------------
-    # Final response to UI
+    # Final response to UI (answer is already shown; add metrics when ready)
     # -------------------------
-    await cl.Message(
-        content=(
-            f"{answer}\n\n"
-            f"📊 **Evaluation Metrics**\n"
-            f"- ROUGE-L F1: `{metrics['rougeL_f1']:.3f}`\n"
-            f"- BLEU: `{metrics['bleu']:.3f}`"
-        )
-    ).send()
+    await reply.update()
+    metrics = await asyncio.wrap_future(pending_metrics)
+
+    reply.content = (
+        f"{answer}\n\n"
+        f"📊 **Evaluation Metrics**\n"
+        f"- ROUGE-L F1: `{metrics['rougeL_f1']:.3f}`\n"
+        f"- BLEU: `{metrics['bleu']:.3f}`"
+    )
+    await reply.update()
@@ -0,0 +1,148 @@
+"""
+Compare FAISS index types: recall@k against exact search, latency, memory.
+
+Usage:
+    python -m benchmarks.bench_faiss_index --sizes 10000 100000
+    python -m benchmarks.bench_faiss_index --types flat hnsw ivf_pq --k 4
+    python -m benchmarks.bench_faiss_index --real-model   # MiniLM on policy chunks
+
+Each index is built exactly as VectorStoreManager builds it
+(chatbot.faiss_index.build_index, same AppConfig parameters). By default
+vectors are synthetic and topic-clustered (dim 384, like MiniLM) so
+large corpora need no encoder; queries are perturbed corpus vectors.
+Latency is per single-query search, as on the request path.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import faiss  # noqa: E402
+
+from chatbot.faiss_index import INDEX_TYPES, build_index, index_nbytes  # noqa: E402
+
+
+def synthetic_vectors(n: int, dim: int = 384, topics: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Unit vectors scattered around `topics` centres, like chunk embeddings
+    of a corpus with recurring subjects.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype("float32")
+    vectors = centres[rng.integers(0, topics, n)]
+    vectors += 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def model_vectors(n: int) -> np.ndarray:
+    """
+    MiniLM embeddings of policy chunks, replicated with light edits up to
+    `n` chunks.
+    """
+    from chatbot.chunking import DocumentChunker
+    from chatbot.embeddings import EmbeddingService
+    from chatbot.loader import MultiDocumentLoader
+
+    docs = MultiDocumentLoader(PROJECT_ROOT / "data" / "hr_policies").load_documents()
+    base = [c.page_content for c in DocumentChunker().chunk_documents(docs)]
+    texts = [f"{base[i % len(base)]} (copy {i // len(base)})" for i in range(n)]
+    return EmbeddingService().encode_documents(texts)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), count)]
+    queries = picks + 0.05 * rng.standard_normal(picks.shape).astype("float32")
+    return np.ascontiguousarray(queries, dtype="float32")
+
+
+def bench_index(
+    index_type: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int
+) -> Dict[str, float]:
+    start = time.perf_counter()
+    index = build_index(vectors, index_type)
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype="int64")
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found[i] = ids[0]
+
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    nbytes = index_nbytes(index)
+
+    return {
+        "index": type(index).__name__,
+        "build_s": build_s,
+        "recall_at_k": hits / truth.size,
+        "latency_ms_p50": statistics.median(latencies) * 1000,
+        "latency_ms_p95": float(np.percentile(latencies, 95)) * 1000,
+        "bytes": nbytes,
+        "bytes_per_vector": nbytes / len(vectors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES),
+                        choices=INDEX_TYPES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=1,
+                        help="FAISS OpenMP threads (1 = per-request latency)")
+    parser.add_argument("--real-model", action="store_true")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="also write the results as JSON")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    report = {"k": args.k, "queries": args.queries, "sizes": {}}
+
+    for n in args.sizes:
+        vectors = model_vectors(n) if args.real_model else synthetic_vectors(n)
+        queries = make_queries(vectors, args.queries)
+
+        exact = faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+
+        print(f"▶ n={n}")
+        print(
+            f"  {'type':<10} {'recall@' + str(args.k):>9} {'p50_ms':>8} {'p95_ms':>8}"
+            f" {'MB':>8} {'B/vec':>7} {'build_s':>8}"
+        )
+        results = {}
+        for index_type in args.types:
+            stats = bench_index(index_type, vectors, queries, truth, args.k)
+            results[index_type] = stats
+            print(
+                f"  {index_type:<10} {stats['recall_at_k']:>9.3f}"
+                f" {stats['latency_ms_p50']:>8.3f} {stats['latency_ms_p95']:>8.3f}"
+                f" {stats['bytes'] / 2**20:>8.1f} {stats['bytes_per_vector']:>7.0f}"
+                f" {stats['build_s']:>8.2f}"
+            )
+        report["sizes"][str(n)] = results
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
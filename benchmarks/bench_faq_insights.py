@@ -0,0 +1,160 @@
+"""
+Benchmark FAQInsights.top_faqs against the original pairwise implementation.
+
+Usage:
+    python -m benchmarks.bench_faq_insights --sizes 500 2000 20000 200000
+    python -m benchmarks.bench_faq_insights --real-model   # MiniLM embeddings
+
+By default questions get synthetic, topic-clustered embeddings so the
+clustering engine is measured in isolation from the encoder.
+"""
+import argparse
+import hashlib
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from chatbot.faq_insights import FAQInsights  # noqa: E402
+
+TOPICS = [
+    "How many sick leave days do I get",
+    "What is the per diem for domestic travel",
+    "When are performance reviews held",
+    "How long is the notice period",
+    "Can I work remotely",
+    "What is the dress code on Fridays",
+    "How many weeks of maternity leave are there",
+    "Is health insurance provided",
+]
+
+
+class SyntheticEmbeddingService:
+    """
+    Deterministic stand-in for EmbeddingService: texts sharing a topic
+    prefix land close together, each variant gets a little noise.
+    """
+
+    def __init__(self, dim: int = 384, noise: float = 0.08):
+        self.dim = dim
+        self.noise = noise
+
+    def _vector(self, text: str) -> np.ndarray:
+        topic = text.split(" #", 1)[0]
+        base = np.random.default_rng(
+            int(hashlib.md5(topic.encode()).hexdigest()[:8], 16)
+        ).standard_normal(self.dim)
+        jitter = np.random.default_rng(
+            int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        ).standard_normal(self.dim)
+        return base / np.linalg.norm(base) + self.noise * jitter / np.sqrt(self.dim)
+
+    def encode_queries(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        vectors = np.vstack([self._vector(t) for t in texts]).astype("float32")
+        if normalize:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+def synthetic_questions(n: int, seed: int = 0) -> List[str]:
+    """
+    Logged-question-like workload: mostly repeats, some rephrasings and a
+    long tail of one-off questions.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.6:
+            questions.append(rng.choice(TOPICS))
+        elif roll < 0.9:
+            questions.append(f"{rng.choice(TOPICS)} #{rng.randint(0, 50)}")
+        else:
+            questions.append(f"one-off question #{rng.randint(0, n)}")
+    return questions
+
+
+def legacy_top_faqs(
+    questions: List[str], embeddings: np.ndarray, threshold: float, top_k: int = 5
+) -> Dict[str, int]:
+    """
+    The original O(n^2) pairwise loop, kept verbatim for comparison.
+    """
+    try:
+        from sentence_transformers import util
+
+        def cos_sim(a, b):
+            return util.cos_sim(a, b).item()
+    except ImportError:
+        def cos_sim(a, b):
+            return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    visited = set()
+    clusters = defaultdict(int)
+
+    for i, q in enumerate(questions):
+        if i in visited:
+            continue
+
+        clusters[q] += 1
+        visited.add(i)
+
+        for j in range(i + 1, len(questions)):
+            if j in visited:
+                continue
+
+            score = cos_sim(embeddings[i], embeddings[j])
+            if score >= threshold:
+                clusters[q] += 1
+                visited.add(j)
+
+    return dict(sorted(clusters.items(), key=lambda x: x[1], reverse=True)[:top_k])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 20000, 200000])
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="skip the pairwise baseline above this size")
+    parser.add_argument("--real-model", action="store_true")
+    args = parser.parse_args()
+
+    if args.real_model:
+        # No embedding cache: measure the model itself
+        from chatbot.embeddings import EmbeddingService
+        service = EmbeddingService()
+    else:
+        service = SyntheticEmbeddingService()
+
+    print(f"{'n':>8} {'vectorized_s':>13} {'legacy_s':>10} {'same_top_k':>11}")
+
+    for n in args.sizes:
+        questions = synthetic_questions(n)
+
+        start = time.perf_counter()
+        fast = FAQInsights(questions, args.threshold, embedding_service=service).top_faqs()
+        fast_s = time.perf_counter() - start
+
+        legacy_s, same = "-", "-"
+        if n <= args.legacy_max:
+            embeddings = service.encode_queries(questions)
+            start = time.perf_counter()
+            slow = legacy_top_faqs(questions, embeddings, args.threshold)
+            legacy_s = f"{time.perf_counter() - start:.3f}"
+            # Order too: ties must keep the legacy order
+            same = str(list(slow.items()) == list(fast.items()))
+
+        print(f"{n:>8} {fast_s:>13.3f} {legacy_s:>10} {same:>11}")
+
+
+if __name__ == "__main__":
+    main()
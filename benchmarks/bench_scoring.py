@@ -0,0 +1,110 @@
+"""
+Compare chatbot.scoring with rouge_score + NLTK: agreement and speed.
+
+Usage:
+    python -m benchmarks.bench_scoring
+    python -m benchmarks.bench_scoring --context-tokens 200 1000 4000 --pairs 200
+
+Answers are spans of the policy text with some words shuffled in;
+references are contexts of the given length around them (like the
+concatenated retrieved chunks the evaluator scores against).
+"""
+import argparse
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from chatbot import scoring  # noqa: E402
+
+
+def make_pairs(n: int, context_tokens: int, seed: int = 0) -> List[Tuple[str, str]]:
+    words = (PROJECT_ROOT / "data" / "hr_policies" / "acme_hr_policy.txt").read_text(
+        encoding="utf-8"
+    ).split()
+    while len(words) < context_tokens + 200:
+        words = words + words
+
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(n):
+        start = rng.randint(0, len(words) - context_tokens - 1)
+        context = words[start:start + context_tokens]
+        answer = [
+            rng.choice(context) if rng.random() < 0.3 else word
+            for word in context[rng.randint(0, 20):rng.randint(40, 120)]
+        ]
+        pairs.append((" ".join(answer), " ".join(context)))
+    return pairs
+
+
+def legacy_scorer():
+    from nltk.translate.bleu_score import SmoothingFunction, sentence_bleu
+    from rouge_score import rouge_scorer
+
+    rouge = rouge_scorer.RougeScorer(["rougeL"], use_stemmer=True)
+    smooth = SmoothingFunction().method1
+
+    def score(answer: str, reference: str):
+        return {
+            "rougeL_f1": rouge.score(reference, answer)["rougeL"].fmeasure,
+            "bleu": sentence_bleu(
+                [reference.split()], answer.split(), smoothing_function=smooth
+            ),
+        }
+
+    return score
+
+
+def clear_caches():
+    for cached in (
+        scoring.rouge_tokens,
+        scoring.bleu_tokens,
+        scoring._match_masks,
+        scoring._reference_ngrams,
+    ):
+        cached.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--context-tokens", type=int, nargs="+", default=[200, 1000, 4000])
+    parser.add_argument("--pairs", type=int, default=100)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    legacy = legacy_scorer()
+
+    print(f"{'context':>8} {'legacy_ms':>10} {'native_ms':>10} {'speedup':>8} {'max_diff':>10}")
+    for context_tokens in args.context_tokens:
+        pairs = make_pairs(args.pairs, context_tokens)
+
+        start = time.perf_counter()
+        expected = [legacy(a, r) for a, r in pairs]
+        legacy_s = time.perf_counter() - start
+
+        clear_caches()
+        start = time.perf_counter()
+        actual = scoring.score_batch(pairs)
+        native_s = time.perf_counter() - start
+
+        max_diff = max(
+            abs(e[key] - a[key])
+            for e, a in zip(expected, actual)
+            for key in ("rougeL_f1", "bleu")
+        )
+        print(
+            f"{context_tokens:>8} {legacy_s / len(pairs) * 1000:>10.3f}"
+            f" {native_s / len(pairs) * 1000:>10.3f}"
+            f" {legacy_s / native_s:>7.1f}x {max_diff:>10.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from chatbot.config import config
+
+
+class NoBackendAvailable(RuntimeError):
+    """
+    Raised when every LLM backend is unhealthy, tripped or failed.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    closed    -> calls flow; consecutive failures are counted
+    open      -> calls are rejected until `reset_timeout` has elapsed
+    half_open -> a single probe call is let through; success closes the
+                 circuit, failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = config.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = config.CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            # Half-open: exactly one probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if (
+                self.state == self.HALF_OPEN
+                or self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class BackendStats:
+    """
+    Request, error and latency counters for one backend.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.last_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self.total_latency += latency
+            self.last_latency = latency
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_latency_s": (
+                    self.total_latency / self.requests if self.requests else 0.0
+                ),
+                "last_latency_s": self.last_latency or 0.0,
+            }
+
+
+class BackendRouter:
+    """
+    Picks LLM backends in priority order without probing them on every
+    request.
+
+    Health checks are cached for `health_ttl` seconds; a stale entry is
+    refreshed in the background while the cached value keeps serving, so
+    only the very first lookup pays for a check. Backends with an open
+    circuit are skipped immediately.
+    """
+
+    def __init__(
+        self,
+        backends: List[str],
+        health_checks: Dict[str, Callable[[], bool]],
+        health_ttl: float = config.BACKEND_HEALTH_TTL,
+    ):
+        self.backends = backends
+        self.health_checks = health_checks
+        self.health_ttl = health_ttl
+        self.breakers = {name: CircuitBreaker() for name in backends}
+        self.stats = {name: BackendStats() for name in backends}
+
+        self._health: Dict[str, bool] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Health cache
+    # -----------------------------
+    def _check(self, name: str) -> bool:
+        check = self.health_checks.get(name)
+        try:
+            healthy = check() if check else True
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            self._health[name] = healthy
+            self._checked_at[name] = time.monotonic()
+            self._refreshing.discard(name)
+        return healthy
+
+    def needs_blocking_check(self) -> bool:
+        """
+        True until every backend has been checked once.
+        """
+        return any(name not in self._health for name in self.backends)
+
+    def check_unknown(self):
+        """
+        Run the first health check of every backend not yet checked.
+        """
+        for name in self.backends:
+            if name not in self._health:
+                self._check(name)
+
+    def is_healthy(self, name: str) -> bool:
+        with self._lock:
+            known = name in self._health
+            stale = (
+                known
+                and time.monotonic() - self._checked_at[name] > self.health_ttl
+                and name not in self._refreshing
+            )
+            if stale:
+                self._refreshing.add(name)
+
+        if not known:
+            return self._check(name)
+
+        if stale:
+            threading.Thread(
+                target=self._check, args=(name,), daemon=True
+            ).start()
+
+        return self._health[name]
+
+    # -----------------------------
+    # Routing
+    # -----------------------------
+    def candidates(self) -> Iterator[str]:
+        """
+        Backends to try, in priority order. Lazy, so a half-open circuit
+        only admits its probe when the caller actually gets to it.
+        """
+        for name in self.backends:
+            if self.is_healthy(name) and self.breakers[name].allow():
+                yield name
+
+    def preferred(self) -> Optional[str]:
+        """
+        Backend a new request would most likely be served by, judged from
+        cached health and circuit state only: never blocks on a health
+        check and admits no half-open probe.
+        """
+        for name in self.backends:
+            if (
+                self._health.get(name, True)
+                and self.breakers[name].state != CircuitBreaker.OPEN
+            ):
+                return name
+        return None
+
+    def record(self, name: str, latency: float, ok: bool):
+        self.stats[name].record(latency, ok)
+        if ok:
+            self.breakers[name].record_success()
+        else:
+            # Left to the breaker (threshold, half-open probe); the health
+            # cache only reflects health checks
+            self.breakers[name].record_failure()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "healthy": self._health.get(name),
+                "circuit": self.breakers[name].state,
+                **self.stats[name].snapshot(),
+            }
+            for name in self.backends
+        }
@@ -0,0 +1,240 @@
+import json
+import mmap
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from chatbot.faiss_index import configure_search
+
+# -----------------------------
+# On-disk layout (all in VECTORSTORE_DIR)
+# -----------------------------
+# chunks.bin               UTF-8 texts, then UTF-8 JSON metadata (two columns)
+# chunks_offsets.npy       int64 (2, n + 1): byte offsets of text / metadata
+# chunk_ids.npy            chunk ids in FAISS position order
+# chunk_ids_sorted.npy     the same ids sorted, for binary search ...
+# chunk_ids_order.npy      ... and the FAISS position of each sorted id
+#
+# Everything is opened with mmap, so worker processes on one host share
+# the page cache and nothing is unpickled.
+DATA_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks_offsets.npy"
+IDS_FILE = "chunk_ids.npy"
+SORTED_IDS_FILE = "chunk_ids_sorted.npy"
+ORDER_FILE = "chunk_ids_order.npy"
+INDEX_FILE = "index.faiss"
+
+# Read-only mmap of the index data; flat codes, HNSW storage and IVF lists
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _replace(path: Path, data: Union[bytes, np.ndarray]):
+    """
+    Write to a temp file and rename over `path`, so processes that have
+    the old file mapped keep reading a consistent copy.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        if isinstance(data, np.ndarray):
+            np.save(f, data, allow_pickle=False)
+        else:
+            f.write(data)
+    os.replace(tmp, path)
+
+
+def write_index(index: faiss.Index, directory: Path):
+    path = Path(directory) / INDEX_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, path)
+
+
+def read_index(directory: Path, mmap_data: bool = True) -> faiss.Index:
+    """
+    Open the persisted FAISS index, memory-mapped unless it will be
+    modified (a mapped index is read-only).
+    """
+    path = str(Path(directory) / INDEX_FILE)
+    if mmap_data:
+        try:
+            return faiss.read_index(path, _MMAP_FLAGS)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+class ChunkStore:
+    """
+    Columnar, offset-indexed store of chunk texts and metadata.
+
+    Opening it maps the files and reads nothing; `get` materialises one
+    Document from its byte range.
+    """
+
+    def __init__(self, directory: Path):
+        directory = Path(directory)
+        with open(directory / DATA_FILE, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+        self._offsets = np.load(directory / OFFSETS_FILE, mmap_mode="r")
+        self.ids = np.load(directory / IDS_FILE, mmap_mode="r")
+        self._sorted_ids = np.load(directory / SORTED_IDS_FILE, mmap_mode="r")
+        self._order = np.load(directory / ORDER_FILE, mmap_mode="r")
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = Path(directory)
+        return all(
+            (directory / name).exists()
+            for name in (DATA_FILE, OFFSETS_FILE, IDS_FILE, SORTED_IDS_FILE, ORDER_FILE)
+        )
+
+    @staticmethod
+    def write(directory: Path, ids: Sequence[str], docs: Sequence[Document]):
+        """
+        Persist `docs` in FAISS position order, `ids` being their docstore ids.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        texts = [doc.page_content.encode("utf-8") for doc in docs]
+        metas = [
+            json.dumps(doc.metadata, ensure_ascii=False, default=str).encode("utf-8")
+            for doc in docs
+        ]
+
+        text_offsets = np.zeros(len(docs) + 1, dtype="int64")
+        np.cumsum([len(t) for t in texts], out=text_offsets[1:])
+        meta_offsets = np.zeros(len(docs) + 1, dtype="int64")
+        np.cumsum([len(m) for m in metas], out=meta_offsets[1:])
+        meta_offsets += text_offsets[-1]
+
+        id_array = np.asarray(list(ids), dtype=str)
+        order = np.argsort(id_array, kind="stable").astype("int64")
+
+        # Data first: readers of the previous version keep their mappings
+        _replace(directory / DATA_FILE, b"".join(texts) + b"".join(metas))
+        _replace(directory / OFFSETS_FILE, np.vstack([text_offsets, meta_offsets]))
+        _replace(directory / IDS_FILE, id_array)
+        _replace(directory / SORTED_IDS_FILE, id_array[order])
+        _replace(directory / ORDER_FILE, order)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, doc_id: str) -> Optional[int]:
+        """
+        FAISS position of `doc_id` (binary search, no id -> row dict).
+        """
+        i = int(np.searchsorted(self._sorted_ids, doc_id))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == doc_id:
+            return int(self._order[i])
+        return None
+
+    def get(self, position: int) -> Document:
+        text_start, text_end = self._offsets[0, position], self._offsets[0, position + 1]
+        meta_start, meta_end = self._offsets[1, position], self._offsets[1, position + 1]
+        return Document(
+            page_content=self._data[text_start:text_end].decode("utf-8"),
+            metadata=json.loads(self._data[meta_start:meta_end].decode("utf-8")),
+        )
+
+    def documents(self) -> Dict[str, Document]:
+        """
+        Every chunk, keyed by id (used to rebuild a writable docstore).
+        """
+        return {str(doc_id): self.get(i) for i, doc_id in enumerate(self.ids)}
+
+
+class PositionIds(Mapping):
+    """
+    `index_to_docstore_id` for LangChain's FAISS, backed by the mapped id
+    column instead of a dict.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self._store = store
+
+    def __getitem__(self, position) -> str:
+        position = int(position)
+        if not 0 <= position < len(self._store):
+            raise KeyError(position)
+        return str(self._store.ids[position])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._store)))
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+class MmapDocstore(Docstore):
+    """
+    Read-only docstore over a ChunkStore; documents are materialised
+    only for the ids a search returns.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = self.store.position(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.store.get(position)
+
+
+# -----------------------------
+# Vectorstore persistence
+# -----------------------------
+def save_vectorstore(vectorstore: FAISS, directory: Path):
+    """
+    Persist a LangChain FAISS vectorstore without pickle.
+    """
+    directory = Path(directory)
+    ids = [
+        vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)
+    ]
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+
+    ChunkStore.write(directory, ids, docs)
+    write_index(vectorstore.index, directory)
+
+
+def open_vectorstore(
+    directory: Path, embeddings: Embeddings, writable: bool = False
+) -> FAISS:
+    """
+    Open a vectorstore saved by `save_vectorstore`.
+
+    By default the index and the chunk store stay memory-mapped
+    (read-only). `writable=True` loads both into memory so chunks can be
+    added or deleted.
+    """
+    store = ChunkStore(directory)
+    index = configure_search(read_index(directory, mmap_data=not writable))
+
+    if writable:
+        docstore = InMemoryDocstore(store.documents())
+        index_to_docstore_id = {i: str(doc_id) for i, doc_id in enumerate(store.ids)}
+    else:
+        docstore = MmapDocstore(store)
+        index_to_docstore_id = PositionIds(store)
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
@@ -18,6 +18,8 @@ class DocumentChunker:
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             separators=["\n\n", "\n", ".", " ", ""],
+            # Offsets let the context packer merge overlapping chunks
+            add_start_index=True,
         )
 
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
@@ -1,5 +1,8 @@
+import os
+
 from pydantic import BaseModel
 from pathlib import Path
+from typing import Dict, Union
 
 
 class AppConfig(BaseModel):
@@ -14,12 +17,118 @@ class AppConfig(BaseModel):
     # Retrieval
     TOP_K: int = 4
 
+    # Hybrid retrieval (BM25 + dense, fused with reciprocal rank fusion)
+    HYBRID_RETRIEVAL: bool = True
+    HYBRID_CANDIDATES: int = 20
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    RRF_K: int = 60
+    # Queries of at most this many terms, all in the index vocabulary and
+    # without function words ("per diem", "paternity leave"), skip the
+    # embedding model entirely
+    KEYWORD_QUERY_MAX_TERMS: int = 3
+
+    # FAISS index: flat | hnsw | ivf_flat | ivf_pq | sq_fp16
+    # (see benchmarks/bench_faiss_index.py for recall / latency / memory)
+    FAISS_INDEX_TYPE: str = "flat"
+    FAISS_HNSW_M: int = 32
+    FAISS_HNSW_EF_CONSTRUCTION: int = 80
+    FAISS_HNSW_EF_SEARCH: int = 64
+    FAISS_IVF_NLIST: int = 0  # 0 = ~4*sqrt(n), capped by corpus size
+    FAISS_IVF_NPROBE: int = 16
+    FAISS_PQ_M: int = 48  # sub-quantizers; rounded down to a divisor of dim
+    FAISS_PQ_NBITS: int = 8
+    # Vectors buffered to train IVF / PQ indexes during streaming ingestion
+    FAISS_TRAIN_SAMPLE: int = 20000
+
+    # Ingestion (streaming; files chunked in a process pool)
+    INGEST_WORKERS: int = max(1, (os.cpu_count() or 2) - 1)
+    INGEST_FILES_PER_TASK: int = 32
+    INGEST_BATCH_SIZE: int = 512
+    INGEST_PROGRESS_INTERVAL: float = 2.0
+
+    # Prompt budget per LLM backend (tokens)
+    BACKEND_CONTEXT_WINDOWS: Dict[str, int] = {"ollama": 2048, "huggingface": 1024}
+    BACKEND_GENERATION_RESERVE: Dict[str, int] = {"ollama": 512, "huggingface": 256}
+    # Ungated tokenizer repos (mistralai/* needs an HF token); Mistral
+    # v0.1 / v0.2 share this 32k vocabulary
+    BACKEND_TOKENIZERS: Dict[str, str] = {
+        "ollama": "Xenova/mistral-tokenizer-v1",
+        "huggingface": "distilgpt2",
+    }
+    FALLBACK_TOKENIZER: str = "distilgpt2"
+
+    # Retrieval-confidence gate: when the best dense similarity is below
+    # this, reply "not in the policy" without calling the LLM
+    # (calibrate with scripts/calibrate_retrieval_gate.py)
+    RETRIEVAL_GATE_ENABLED: bool = True
+    RETRIEVAL_MIN_SCORE: float = 0.25
+
+    # Small-talk fast path: answered without retrieval or an LLM call
+    SMALL_TALK_ENABLED: bool = True
+    SMALL_TALK_MAX_WORDS: int = 8
+    SMALL_TALK_THRESHOLD: float = 0.75  # cosine to the nearest intent centroid
+    SMALL_TALK_MARGIN: float = 0.15  # ... and this much closer than to a policy question
+
+    # Coalesce concurrent identical questions into one retrieval + generation
+    REQUEST_COALESCING: bool = True
+
+    # Semantic answer cache
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_PATH: Path = Path("storage/semantic_cache.db")
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_TTL: float = 7 * 24 * 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+
+    # Persistent embedding cache (index builds and query embedding)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: Path = Path("storage/embedding_cache.db")
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 2**20
+    EMBEDDING_CACHE_DTYPE: str = "float16"  # or "float32" (exact, twice the size)
+
     # Models
     LLM_MODEL: str = "gpt-3.5-turbo"
-    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+
+    # LLM backend routing
+    BACKEND_HEALTH_TTL: float = 15.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 3
+    CIRCUIT_RESET_TIMEOUT: float = 30.0
+
+    # Ollama model lifecycle: preload at startup, keep resident while idle
+    # Sent with every request: a Go duration ("30m", "-1m" = forever) or
+    # seconds (-1 = forever)
+    OLLAMA_KEEP_ALIVE: Union[str, int] = "30m"
+    OLLAMA_WARMUP_PROMPT: str = "Hello"
+    # Idle seconds before re-pinning the model (0 = off). Keep it below a
+    # finite KEEP_ALIVE; with "forever" it only reloads the model after an
+    # Ollama restart
+    OLLAMA_REFRESH_INTERVAL: float = 600.0
+
+    # HuggingFace fallback micro-batching
+    HF_MAX_BATCH_SIZE: int = 8
+    HF_BATCH_WAIT: float = 0.02
+    HF_MAX_NEW_TOKENS: int = 256
+
+    # Offline batch answering (HRPolicyRAG.answer_batch): generations
+    # in flight at once
+    BATCH_CONCURRENCY: int = 4
+
+    # Concurrency (bounded executors for the async request path)
+    CPU_WORKERS: int = max(2, (os.cpu_count() or 2) // 2)
+    IO_WORKERS: int = 8
+
+    # Chat history (group commits)
+    HISTORY_BATCH_SIZE: int = 100
+    HISTORY_FLUSH_INTERVAL: float = 0.05
+
+    # Startup
+    STARTUP_REPORT_PATH: Path = Path("storage/startup_report.json")
 
     # Tracking
     MLFLOW_EXPERIMENT_NAME: str = "hr_rag_assistant"
+    EVAL_FLUSH_INTERVAL: float = 30.0
+    EVAL_BATCH_SIZE: int = 50
 
 
 # Singleton config object
@@ -0,0 +1,229 @@
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from chatbot.config import config
+
+
+# -----------------------------
+# Tokenizers
+# -----------------------------
+@lru_cache(maxsize=None)
+def get_token_counter(backend: str) -> Callable[[str], int]:
+    """
+    Token counter for a backend, using its real tokenizer when available.
+
+    Falls back to the distilgpt2 tokenizer (GPT-2 BPE, slightly
+    pessimistic for Mistral) and finally to a 4-characters-per-token
+    estimate when transformers or the tokenizer files are unavailable.
+    """
+    for name in (config.BACKEND_TOKENIZERS.get(backend), config.FALLBACK_TOKENIZER):
+        if not name:
+            continue
+        try:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(name)
+        except Exception as e:
+            print(f"⚠️ Tokenizer '{name}' unavailable for {backend}: {e}")
+            continue
+        print(f"🔤 Counting {backend} prompt tokens with '{name}'")
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+    print(f"⚠️ No tokenizer for {backend}; estimating 4 characters per token")
+    return lambda text: (len(text) + 3) // 4
+
+
+def context_budget(backend: str) -> int:
+    """
+    Tokens the whole prompt may use on `backend`: context window minus
+    the tokens reserved for generation.
+    """
+    return (
+        config.BACKEND_CONTEXT_WINDOWS[backend]
+        - config.BACKEND_GENERATION_RESERVE[backend]
+    )
+
+
+# -----------------------------
+# Packing
+# -----------------------------
+class _Segment:
+    def __init__(self, doc: Document, rank: int):
+        self.source = doc.metadata.get("source", "")
+        self.start: Optional[int] = doc.metadata.get("start_index")
+        self.text = doc.page_content
+        self.rank = rank
+
+    def copy(self) -> "_Segment":
+        segment = _Segment.__new__(_Segment)
+        segment.__dict__.update(self.__dict__)
+        return segment
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+def _suffix_prefix_overlap(left: str, right: str, max_overlap: int) -> int:
+    """
+    Length of the longest suffix of `left` that is a prefix of `right`.
+    """
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into a compact context string.
+
+    1. Chunks from the same source that overlap (CHUNK_OVERLAP) or touch
+       are merged into one span, so the shared text appears once.
+    2. Spans contained in another span are dropped.
+    3. Spans are added in retrieval order until the token budget is
+       spent; the last one is truncated to fit.
+    """
+
+    def __init__(
+        self,
+        separator: str = "\n\n",
+        max_overlap: int = config.CHUNK_OVERLAP,
+        min_overlap: int = 20,
+    ):
+        self.separator = separator
+        self.max_overlap = max_overlap
+        # Shorter textual overlaps are likely coincidental
+        self.min_overlap = min_overlap
+
+    def merge(self, docs: List[Document]) -> List[str]:
+        """
+        Merge overlapping chunks; returns spans in retrieval order.
+        """
+        by_source: Dict[str, List[_Segment]] = {}
+        for rank, doc in enumerate(docs):
+            segment = _Segment(doc, rank)
+            by_source.setdefault(segment.source, []).append(segment)
+
+        merged: List[_Segment] = []
+        for segments in by_source.values():
+            merged.extend(self._merge_source(segments))
+
+        merged.sort(key=lambda s: s.rank)
+
+        spans: List[str] = []
+        for segment in merged:
+            if any(segment.text in kept for kept in spans):
+                continue
+            spans = [kept for kept in spans if kept not in segment.text]
+            spans.append(segment.text)
+        return spans
+
+    def _merge_source(self, segments: List[_Segment]) -> List[_Segment]:
+        if all(s.start is not None for s in segments):
+            merged = self._merge_by_offset(segments)
+            if merged is not None:
+                return merged
+
+        # Older index without offsets, or offsets that no longer agree:
+        # detect the overlap textually
+        out: List[_Segment] = []
+        for seg in segments:
+            for prev in out:
+                if seg.text in prev.text:
+                    prev.rank = min(prev.rank, seg.rank)
+                    break
+                size = _suffix_prefix_overlap(prev.text, seg.text, self.max_overlap)
+                if size >= self.min_overlap:
+                    prev.text += seg.text[size:]
+                    prev.rank = min(prev.rank, seg.rank)
+                    break
+                size = _suffix_prefix_overlap(seg.text, prev.text, self.max_overlap)
+                if size >= self.min_overlap:
+                    prev.text = seg.text + prev.text[size:]
+                    prev.rank = min(prev.rank, seg.rank)
+                    break
+            else:
+                out.append(seg)
+        return out
+
+    def pack(
+        self,
+        docs: List[Document],
+        budget_tokens: Optional[int] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ) -> str:
+        """
+        Merged context string, fitted to `budget_tokens` if given.
+        """
+        spans = self.merge(docs)
+        if budget_tokens is None or count_tokens is None:
+            return self.separator.join(spans)
+
+        sep_tokens = count_tokens(self.separator)
+        packed: List[str] = []
+        used = 0
+
+        for span in spans:
+            cost = count_tokens(span) + (sep_tokens if packed else 0)
+            if used + cost <= budget_tokens:
+                packed.append(span)
+                used += cost
+                continue
+
+            remaining = budget_tokens - used - (sep_tokens if packed else 0)
+            head = self._truncate(span, remaining, count_tokens)
+            if head:
+                packed.append(head)
+            break
+
+        return self.separator.join(packed)
+
+    @staticmethod
+    def _merge_by_offset(segments: List[_Segment]) -> Optional[List[_Segment]]:
+        """
+        Merge using the splitter's offsets (add_start_index=True), or None
+        if they contradict the texts: an unchanged chunk kept across an
+        edit higher up in its file still carries its old offset.
+        """
+        segments = sorted(
+            (s.copy() for s in segments), key=lambda s: s.start
+        )
+        out = [segments[0]]
+        for seg in segments[1:]:
+            prev = out[-1]
+            if seg.start > prev.end:
+                out.append(seg)
+                continue
+
+            offset = seg.start - prev.start
+            shared = prev.text[offset:offset + len(seg.text)]
+            if not seg.text.startswith(shared):
+                return None
+            if seg.end > prev.end:
+                prev.text += seg.text[prev.end - seg.start:]
+            prev.rank = min(prev.rank, seg.rank)
+        return out
+
+    @staticmethod
+    def _truncate(text: str, budget: int, count_tokens: Callable[[str], int]) -> str:
+        """
+        Longest prefix of `text`, cut at a word boundary, within `budget`.
+        """
+        if budget <= 0:
+            return ""
+
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count_tokens(text[:mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+
+        head = text[:low]
+        if low < len(text) and " " in head:
+            head = head.rsplit(" ", 1)[0]
+        return head.rstrip()
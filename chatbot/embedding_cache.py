@@ -0,0 +1,200 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from chatbot.config import config
+from chatbot.metrics import EMBEDDING_CACHE_LOOKUPS
+
+_SPACE_RE = re.compile(r"\s+")
+# SQLite's default limit on bound parameters is 999
+_QUERY_CHUNK = 500
+# Eviction frees down to this share of max_bytes, so it doesn't run per insert
+_EVICT_TO = 0.9
+
+
+def text_key(model_name: str, text: str, normalize: bool = False) -> bytes:
+    """
+    16-byte cache key for `text` embedded by `model_name`.
+
+    The text is NFC-normalised and its whitespace runs collapsed first:
+    the tokenizer splits on whitespace, so such variants embed the same.
+    """
+    text = _SPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+    payload = f"{model_name}\x00{int(normalize)}\x00{text}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model, normalised text hash).
+
+    Vectors are stored as raw `dtype` bytes (float16 by default: half the
+    size of float32, far below retrieval noise) in SQLite. Once stored
+    vectors exceed `max_bytes`, the least recently used entries are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        path: Path = config.EMBEDDING_CACHE_PATH,
+        max_bytes: int = config.EMBEDDING_CACHE_MAX_BYTES,
+        dtype: str = config.EMBEDDING_CACHE_DTYPE,
+    ):
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        self._create_tables()
+        self._bytes = self._stored_bytes()
+
+    def _create_tables(self):
+        # WAL: app workers and a re-index can share the file; losing the
+        # last commits on power failure only costs a re-encode
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key BLOB PRIMARY KEY,
+                vector BLOB,
+                last_used REAL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used
+                ON embedding_cache (last_used);
+        """)
+        self.conn.commit()
+
+    def _stored_bytes(self) -> int:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache"
+        ).fetchone()
+        return int(row[0])
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Cached float32 vectors for `keys`, None where missing.
+        """
+        found: Dict[bytes, bytes] = {}
+        unique = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for i in range(0, len(unique), _QUERY_CHUNK):
+                chunk = unique[i:i + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                    chunk,
+                ))
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+
+        return [
+            np.frombuffer(found[key], dtype=self.dtype).astype("float32")
+            if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        stored = np.asarray(vectors).astype(self.dtype, copy=False)
+        now = time.time()
+
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?)",
+                [(key, row.tobytes(), now) for key, row in zip(keys, stored)],
+            )
+            self._bytes += stored.nbytes
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Other processes write too: recount before deleting anything
+        self._bytes = self._stored_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+
+        count, = self.conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+        row_bytes = self._bytes / max(count, 1)
+        excess = int(np.ceil((self._bytes - _EVICT_TO * self.max_bytes) / row_bytes))
+        self.conn.execute(
+            """
+            DELETE FROM embedding_cache WHERE key IN (
+                SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?
+            )
+            """,
+            (excess,),
+        )
+        self._bytes = self._stored_bytes()
+
+    def encode(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        normalize: bool,
+        encode: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """
+        Embed `texts`, calling `encode` only for texts not cached yet.
+
+        Fresh vectors are rounded to the stored precision as well, so a
+        result never depends on which texts happened to be cached.
+        """
+        keys = [text_key(model_name, text, normalize) for text in texts]
+        vectors = self.get_many(keys)
+
+        missing: Dict[bytes, int] = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, i)
+
+        hits = len(keys) - sum(vector is None for vector in vectors)
+        EMBEDDING_CACHE_LOOKUPS.inc(hits, result="hit")
+        EMBEDDING_CACHE_LOOKUPS.inc(len(keys) - hits, result="miss")
+
+        if missing:
+            fresh = encode([texts[i] for i in missing.values()])
+            self.put_many(list(missing), fresh)
+            fresh = fresh.astype(self.dtype).astype("float32")
+            by_key = dict(zip(missing, fresh))
+            vectors = [
+                by_key[key] if vector is None else vector
+                for key, vector in zip(keys, vectors)
+            ]
+
+        return np.vstack(vectors)
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM embedding_cache")
+            self.conn.commit()
+            self._bytes = 0
+
+
+# -----------------------------
+# Process-wide instance
+# -----------------------------
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
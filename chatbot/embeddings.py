@@ -1,7 +1,117 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import threading
+from typing import Dict, List, Optional
 
+import numpy as np
+from langchain_core.embeddings import Embeddings
 
-def get_embeddings():
-    return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
\ No newline at end of file
+from chatbot.config import config
+from chatbot.embedding_cache import EmbeddingCache, get_embedding_cache
+
+
+class EmbeddingService:
+    """
+    Lazily loaded, thread-safe sentence-transformer shared by every
+    component of the process (retrieval, FAQ insights, ...).
+
+    With a `cache`, only texts it has never seen reach the model.
+    """
+
+    def __init__(
+        self,
+        model_name: str = config.EMBEDDING_MODEL,
+        batch_size: int = 64,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def warm_up(self):
+        """
+        Load the model now (e.g. from a background thread at startup).
+        """
+        self._get_model()
+
+    def _encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+
+        if self.cache is not None:
+            return self.cache.encode(
+                self.model_name,
+                texts,
+                normalize,
+                lambda missing: self._encode_model(missing, normalize),
+            )
+        return self._encode_model(texts, normalize)
+
+    def _encode_model(self, texts: List[str], normalize: bool) -> np.ndarray:
+        return self._get_model().encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).astype("float32", copy=False)
+
+    def encode_documents(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        Batch-encode documents / chunks. Returns a (n, dim) float32 array.
+        """
+        return self._encode(texts, normalize)
+
+    def encode_queries(self, texts: List[str], normalize: bool = False) -> np.ndarray:
+        """
+        Batch-encode user questions. Returns a (n, dim) float32 array.
+        """
+        return self._encode(texts, normalize)
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` adapter over an `EmbeddingService`, so FAISS
+    reuses the process-wide model instead of loading its own copy.
+    """
+
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.service.encode_documents(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.service.encode_queries([text])[0].tolist()
+
+
+# -----------------------------
+# Process-wide registry
+# -----------------------------
+_services: Dict[str, EmbeddingService] = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str = config.EMBEDDING_MODEL) -> EmbeddingService:
+    with _registry_lock:
+        if model_name not in _services:
+            cache = get_embedding_cache() if config.EMBEDDING_CACHE_ENABLED else None
+            _services[model_name] = EmbeddingService(model_name, cache=cache)
+        return _services[model_name]
+
+
+def get_embeddings(model_name: str = config.EMBEDDING_MODEL) -> SharedEmbeddings:
+    return SharedEmbeddings(get_embedding_service(model_name))
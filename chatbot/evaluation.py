@@ -1,18 +1,99 @@
-import mlflow
-from rouge_score import rouge_scorer
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+import atexit
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from chatbot import scoring
+from chatbot.config import config
+from chatbot.metrics import ERRORS, stage
+
+_STOP = object()
 
 
 class RAGEvaluator:
-    def __init__(self, experiment_name="hr_genai_rag"):
-        # 🔑 IMPORTANT
-        mlflow.set_tracking_uri("file:./mlruns")
-        mlflow.set_experiment(experiment_name)
+    """
+    Scores answers (ROUGE-L / BLEU) and logs them to MLflow off the
+    request path.
+
+    `submit` enqueues an interaction and returns a Future with the
+    metrics. A background worker scores it and buffers the result; the
+    buffer is flushed as ONE MLflow run per time window with step-indexed
+    metrics and an interactions.jsonl artifact.
+    """
 
-        self.rouge = rouge_scorer.RougeScorer(
-            ["rougeL"], use_stemmer=True
+    def __init__(
+        self,
+        experiment_name="hr_genai_rag",
+        flush_interval: float = config.EVAL_FLUSH_INTERVAL,
+        batch_size: int = config.EVAL_BATCH_SIZE,
+    ):
+        # MLflow is imported and configured on the first flush (worker
+        # thread): importing it costs about a second of cold start
+        self.experiment_name = experiment_name
+        self.experiment_id = None
+        self.client = None
+
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._buffer: List[Dict] = []
+        self._worker = threading.Thread(
+            target=self._run, name="rag-evaluator", daemon=True
         )
-        self.smooth_fn = SmoothingFunction().method1
+        self._worker.start()
+        atexit.register(self.close)
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def score(self, answer: str, reference_text: str) -> Dict[str, float]:
+        """
+        ROUGE-L F1 (stemmed) and smoothed sentence BLEU; see
+        chatbot.scoring (matches rouge_score / NLTK).
+        """
+        return scoring.score(answer, reference_text)
+
+    def evaluate_batch(
+        self, pairs: Iterable[Tuple[str, str]]
+    ) -> List[Dict[str, float]]:
+        """
+        Score many (answer, reference_text) pairs now, e.g. offline
+        regression runs. Nothing is logged to MLflow.
+        """
+        with stage("evaluation_batch"):
+            return scoring.score_batch(pairs)
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(
+        self,
+        question: str,
+        answer: str,
+        reference_text: str,
+        model_backend: str,
+    ) -> Future:
+        """
+        Queue an interaction for scoring and logging. Never blocks.
+        """
+        future: Future = Future()
+        self._queue.put(
+            (
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "question": question,
+                    "answer": answer,
+                    "reference_text": reference_text,
+                    "model_backend": model_backend,
+                },
+                future,
+            )
+        )
+        return future
 
     def evaluate(
         self,
@@ -21,27 +102,122 @@ class RAGEvaluator:
         reference_text: str,
         model_backend: str,
     ):
-        with mlflow.start_run():
-            rouge_l = self.rouge.score(
-                reference_text, answer
-            )["rougeL"].fmeasure
-
-            bleu = sentence_bleu(
-                [reference_text.split()],
-                answer.split(),
-                smoothing_function=self.smooth_fn,
-            )
+        """
+        Blocking convenience wrapper: score now, log in the background.
+        """
+        return self.submit(
+            question, answer, reference_text, model_backend
+        ).result()
 
-            mlflow.log_metric("rougeL_f1", rouge_l)
-            mlflow.log_metric("bleu", bleu)
+    def flush(self):
+        """
+        Ask the worker to write buffered interactions now.
+        """
+        done = threading.Event()
+        self._queue.put((None, done))
+        done.wait()
 
-            mlflow.log_param("model_backend", model_backend)
-            mlflow.log_param("question", question)
+    def close(self):
+        if self._worker.is_alive():
+            self._queue.put((_STOP, None))
+            self._worker.join()
 
-            mlflow.log_text(answer, "answer.txt")
-            mlflow.log_text(reference_text, "retrieved_context.txt")
+    # -----------------------------
+    # Background worker
+    # -----------------------------
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
 
-            return {
-                "rougeL_f1": rouge_l,
-                "bleu": bleu,
-            }
\ No newline at end of file
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                record, future = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record, future = None, None
+
+            if record is _STOP:
+                self._flush_buffer()
+                return
+
+            if record is None:
+                # Timer expired or explicit flush request
+                self._flush_buffer()
+                deadline = time.monotonic() + self.flush_interval
+                if future is not None:
+                    future.set()
+                continue
+
+            try:
+                with stage("evaluation"):
+                    metrics = self.score(record["answer"], record["reference_text"])
+            except Exception as e:
+                ERRORS.inc(stage="evaluation")
+                future.set_exception(e)
+                continue
+
+            future.set_result(metrics)
+            self._buffer.append({**record, **metrics})
+
+            if len(self._buffer) >= self.batch_size:
+                self._flush_buffer()
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+
+        records, self._buffer = self._buffer, []
+        try:
+            with stage("evaluation_flush"):
+                self._log_window(records)
+        except Exception as e:
+            ERRORS.inc(stage="evaluation_flush")
+            print("⚠️ Failed to log evaluation batch to MLflow")
+            print(e)
+
+    def _ensure_mlflow(self):
+        if self.client is not None:
+            return
+
+        import mlflow
+        from mlflow.tracking import MlflowClient
+
+        # 🔑 IMPORTANT
+        mlflow.set_tracking_uri("file:./mlruns")
+        self.experiment_id = mlflow.set_experiment(self.experiment_name).experiment_id
+        self.client = MlflowClient()
+
+    def _log_window(self, records: List[Dict]):
+        from mlflow.entities import Metric, Param
+
+        self._ensure_mlflow()
+        run = self.client.create_run(
+            self.experiment_id,
+            run_name=f"window-{records[0]['timestamp']}",
+        )
+        run_id = run.info.run_id
+        now_ms = int(time.time() * 1000)
+
+        metrics = [
+            Metric(key, record[key], now_ms, step)
+            for step, record in enumerate(records)
+            for key in ("rougeL_f1", "bleu")
+        ]
+        params = [
+            Param("num_interactions", str(len(records))),
+            Param(
+                "model_backends",
+                ",".join(sorted({r["model_backend"] for r in records})),
+            ),
+        ]
+        self.client.log_batch(run_id, metrics=[], params=params)
+        # MLflow caps a batch at 1000 metrics
+        for i in range(0, len(metrics), 1000):
+            self.client.log_batch(run_id, metrics=metrics[i:i + 1000])
+
+        self.client.log_text(
+            run_id,
+            "\n".join(json.dumps(r) for r in records),
+            "interactions.jsonl",
+        )
+        self.client.set_terminated(run_id)
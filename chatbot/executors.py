@@ -0,0 +1,79 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, TypeVar
+
+from chatbot.config import config
+
+T = TypeVar("T")
+
+# -----------------------------
+# Bounded executors
+# -----------------------------
+# CPU-bound work (embedding, FAISS search, HF generation). Torch and FAISS
+# release the GIL, so threads overlap; the bound keeps them from
+# oversubscribing the cores.
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.CPU_WORKERS,
+    thread_name_prefix="hr-cpu",
+)
+
+# Blocking I/O (SQLite, MLflow file store, sync HTTP)
+IO_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.IO_WORKERS,
+    thread_name_prefix="hr-io",
+)
+
+
+async def _run(executor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Run a CPU-bound callable off the event loop.
+    """
+    return await _run(CPU_EXECUTOR, fn, *args, **kwargs)
+
+
+async def run_io(fn, *args, **kwargs):
+    """
+    Run a blocking I/O callable off the event loop.
+    """
+    return await _run(IO_EXECUTOR, fn, *args, **kwargs)
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Consume a blocking iterator on the IO executor and re-yield its items
+    on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def pump():
+        try:
+            for item in iterator:
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, None))
+
+    pumping = loop.run_in_executor(IO_EXECUTOR, pump)
+
+    while True:
+        item, error = await queue.get()
+        if item is _DONE:
+            break
+        yield item
+
+    await pumping
+    if error is not None:
+        raise error
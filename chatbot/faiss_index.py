@@ -0,0 +1,212 @@
+import math
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from chatbot.config import config
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq", "sq_fp16")
+
+# faiss warns below ~39 training points per IVF list
+_MIN_POINTS_PER_LIST = 39
+# Fewer PQ centroids than this per sub-quantizer is not worth it
+_MIN_PQ_NBITS = 4
+
+
+def index_spec(index_type: Optional[str] = None) -> str:
+    """
+    Build-time description of an index type (default: FAISS_INDEX_TYPE),
+    stored in the manifest so that changing any of these settings forces
+    a rebuild.
+    """
+    index_type = index_type or config.FAISS_INDEX_TYPE
+    if index_type == "hnsw":
+        return (
+            f"hnsw:M={config.FAISS_HNSW_M},"
+            f"efConstruction={config.FAISS_HNSW_EF_CONSTRUCTION}"
+        )
+    if index_type == "ivf_flat":
+        return f"ivf_flat:nlist={config.FAISS_IVF_NLIST or 'auto'}"
+    if index_type == "ivf_pq":
+        return (
+            f"ivf_pq:nlist={config.FAISS_IVF_NLIST or 'auto'},"
+            f"m={config.FAISS_PQ_M},nbits={config.FAISS_PQ_NBITS}"
+        )
+    return index_type
+
+
+def _nlist(n_vectors: int, requested: int) -> int:
+    """
+    IVF list count: ~4*sqrt(n) unless configured, capped so every list
+    gets enough training points.
+    """
+    nlist = requested or int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // _MIN_POINTS_PER_LIST))
+
+
+def _pq_m(dim: int, requested: int) -> int:
+    """
+    Largest number of PQ sub-quantizers <= `requested` that divides `dim`.
+    """
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def needs_training(index_type: Optional[str] = None) -> bool:
+    """
+    True when the index type learns from the corpus (IVF centroids, PQ
+    codebooks), so building it should wait for a representative sample.
+    """
+    return (index_type or config.FAISS_INDEX_TYPE) in ("ivf_flat", "ivf_pq")
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: Optional[str] = None,
+) -> faiss.Index:
+    """
+    Create an empty, trained L2 index of `index_type` (default:
+    FAISS_INDEX_TYPE) for `vectors`.
+
+    Training parameters shrink to what the corpus can support; an IVF-PQ
+    index falls back to IVF-Flat when there are too few vectors to train
+    its codebooks.
+    """
+    index_type = index_type or config.FAISS_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown FAISS_INDEX_TYPE {index_type!r}; expected one of {INDEX_TYPES}"
+        )
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n_vectors, dim = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config.FAISS_HNSW_M)
+        index.hnsw.efConstruction = config.FAISS_HNSW_EF_CONSTRUCTION
+    elif index_type == "sq_fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    else:
+        nlist = _nlist(n_vectors, config.FAISS_IVF_NLIST)
+        quantizer = faiss.IndexFlatL2(dim)
+        nbits = min(config.FAISS_PQ_NBITS, int(math.log2(max(n_vectors, 1))))
+
+        if index_type == "ivf_pq" and nbits >= _MIN_PQ_NBITS:
+            m = _pq_m(dim, config.FAISS_PQ_M)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, nbits)
+        else:
+            if index_type == "ivf_pq":
+                print(
+                    f"⚠️ {n_vectors} vectors are too few to train IVF-PQ; "
+                    "using IVF-Flat"
+                )
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+
+    if not index.is_trained:
+        index.train(vectors)
+
+    configure_search(index)
+    return index
+
+
+def similarity(distance: float) -> float:
+    """
+    Cosine similarity for a squared L2 distance between unit-norm
+    embeddings (MiniLM's are normalised); the retrieval confidence.
+    """
+    return 1.0 - float(distance) / 2.0
+
+
+def search_batch(vectorstore, vectors: np.ndarray, k: int) -> List[List[Tuple]]:
+    """
+    `similarity_search_with_score_by_vector` for many queries in one
+    FAISS call: per query, a list of (Document, distance).
+    """
+    distances, positions = vectorstore.index.search(
+        np.ascontiguousarray(vectors, dtype="float32"), k
+    )
+    results = []
+    for row_distances, row_positions in zip(distances, positions):
+        hits = []
+        for distance, position in zip(row_distances, row_positions):
+            if position == -1:
+                continue
+            doc_id = vectorstore.index_to_docstore_id[int(position)]
+            doc = vectorstore.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            hits.append((doc, float(distance)))
+        results.append(hits)
+    return results
+
+
+def configure_search(index: faiss.Index) -> faiss.Index:
+    """
+    Apply search-time parameters (IVF nprobe, HNSW efSearch), e.g. after
+    loading an index from disk.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(config.FAISS_IVF_NPROBE, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.FAISS_HNSW_EF_SEARCH
+    return index
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """
+    True when `remove_ids` compacts the index the way LangChain's
+    `FAISS.delete` expects (positions shift down). IVF indexes keep
+    their original ids and HNSW cannot remove at all.
+    """
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def remove_vectors(vectorstore, ids: List[str]):
+    """
+    Delete docstore `ids` from a LangChain FAISS vectorstore, whatever
+    its index type.
+
+    Indexes without compacting removal are rebuilt in place from their
+    own stored vectors: the trained structure (IVF centroids, PQ
+    codebooks) is kept, nothing is re-embedded.
+    """
+    index = vectorstore.index
+    if supports_remove(index):
+        vectorstore.delete(ids)
+        return
+
+    to_remove = set(ids)
+    kept_positions: List[int] = []
+    kept_ids: List[str] = []
+    for position, doc_id in sorted(vectorstore.index_to_docstore_id.items()):
+        if doc_id not in to_remove:
+            kept_positions.append(position)
+            kept_ids.append(doc_id)
+
+    ivf: Optional[faiss.IndexIVF] = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    vectors = index.reconstruct_n(0, index.ntotal)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+
+    index.reset()
+    if kept_positions:
+        index.add(np.ascontiguousarray(vectors[kept_positions]))
+
+    vectorstore.docstore.delete(list(to_remove))
+    vectorstore.index_to_docstore_id = dict(enumerate(kept_ids))
+
+
+def index_nbytes(index: faiss.Index) -> int:
+    """
+    Serialized size of an index, a proxy for its resident memory.
+    """
+    return int(faiss.serialize_index(index).nbytes)
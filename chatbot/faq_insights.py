@@ -1,39 +1,86 @@
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+
+from chatbot.embeddings import EmbeddingService, get_embedding_service
+
+
+def leader_clusters(
+    embeddings: np.ndarray,
+    threshold: float,
+    max_block_elements: int = 2 ** 24,
+) -> np.ndarray:
+    """
+    Greedy leader clustering over L2-normalised embeddings.
+
+    Rows are visited in order; an unassigned row becomes a leader and
+    absorbs every later unassigned row whose cosine similarity reaches
+    `threshold`. Similarities are computed as blocked matrix products
+    against the still-unassigned rows only, so memory stays bounded and
+    work shrinks as clusters form.
+
+    Returns, for every row, the index of its leader.
+    """
+    n = len(embeddings)
+    leader_of = np.full(n, -1, dtype=np.int64)
+    block_size = max(1, min(1024, max_block_elements // max(n, 1)))
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        # Only rows still unassigned can become leaders or members
+        pending = np.flatnonzero(leader_of[start:stop] == -1) + start
+        if not len(pending):
+            continue
+
+        columns = np.flatnonzero(leader_of[start:] == -1) + start
+        sims = embeddings[pending] @ embeddings[columns].T
+
+        for row, i in enumerate(pending):
+            if leader_of[i] != -1:
+                continue
+
+            leader_of[i] = i
+            members = columns[(sims[row] >= threshold) & (columns > i)]
+            members = members[leader_of[members] == -1]
+            leader_of[members] = i
+
+    return leader_of
 
 
 class FAQInsights:
-    def __init__(self, questions: List[str], similarity_threshold: float = 0.85):
+    def __init__(
+        self,
+        questions: List[str],
+        similarity_threshold: float = 0.85,
+        embedding_service: Optional[EmbeddingService] = None,
+    ):
         self.questions = questions
         self.threshold = similarity_threshold
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        # Reuses the process-wide model: no load per chat session
+        self.embeddings = embedding_service or get_embedding_service()
 
     def top_faqs(self, top_k: int = 5) -> Dict[str, int]:
         if not self.questions:
             return {}
 
-        embeddings = self.model.encode(self.questions, convert_to_tensor=True)
-        visited = set()
-        clusters = defaultdict(int)
-
-        for i, q in enumerate(self.questions):
-            if i in visited:
-                continue
-
-            clusters[q] += 1
-            visited.add(i)
+        # Identical questions always land in the same cluster, so embed
+        # and cluster each distinct text once, weighted by its frequency
+        unique: Dict[str, int] = {}
+        for q in self.questions:
+            unique[q] = unique.get(q, 0) + 1
+        texts = list(unique)
+        weights = np.fromiter(unique.values(), dtype=np.int64, count=len(texts))
 
-            for j in range(i + 1, len(self.questions)):
-                if j in visited:
-                    continue
+        embeddings = self.embeddings.encode_queries(texts, normalize=True)
+        leader_of = leader_clusters(embeddings, self.threshold)
 
-                score = util.cos_sim(embeddings[i], embeddings[j]).item()
-                if score >= self.threshold:
-                    clusters[q] += 1
-                    visited.add(j)
+        sizes = np.bincount(leader_of, weights=weights, minlength=len(texts))
+        clusters = defaultdict(int)
+        # Leaders in question order, so ties keep the original ordering
+        for leader in np.unique(leader_of):
+            clusters[texts[leader]] += int(sizes[leader])
 
         return dict(
             sorted(clusters.items(), key=lambda x: x[1], reverse=True)[:top_k]
-        )
\ No newline at end of file
+        )
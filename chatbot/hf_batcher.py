@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List
+
+from chatbot.config import config
+from chatbot.metrics import ERRORS, HF_BATCH_SIZE, HF_QUEUE_WAIT
+
+_DONE = object()
+
+
+class _Request:
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.pieces: queue.Queue = queue.Queue()
+        self.enqueued_at = time.perf_counter()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            item = self.pieces.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+class _BatchStreamer:
+    """
+    `generate` streamer for a whole batch: splits each step's token
+    column by row and forwards decoded text to that row's request.
+    (transformers' TextIteratorStreamer only supports batch size 1.)
+    """
+
+    def __init__(self, tokenizer, requests: List[_Request]):
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self.eos_token_id = tokenizer.eos_token_id
+        self.ids: List[List[int]] = [[] for _ in requests]
+        self.sent = [0] * len(requests)
+        self.finished = [False] * len(requests)
+        self._prompt_seen = False
+
+    def put(self, value):
+        # The first call carries the (padded) prompts
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+
+        for row, token_id in enumerate(value.reshape(-1).tolist()):
+            if self.finished[row]:
+                continue
+            if token_id == self.eos_token_id:
+                # Finished rows keep receiving padding; ignore it
+                self.finished[row] = True
+                self._flush(row, final=True)
+                continue
+            self.ids[row].append(token_id)
+            self._flush(row)
+
+    def end(self):
+        for row, finished in enumerate(self.finished):
+            if not finished:
+                self._flush(row, final=True)
+
+    def _flush(self, row: int, final: bool = False):
+        text = self.tokenizer.decode(self.ids[row], skip_special_tokens=True)
+        # Wait for the rest of a multi-byte character
+        if not final and text.endswith("\ufffd"):
+            return
+        piece = text[self.sent[row]:]
+        if piece:
+            self.requests[row].pieces.put(piece)
+            self.sent[row] = len(text)
+
+
+class HFMicroBatcher:
+    """
+    Batching scheduler in front of the HuggingFace model.
+
+    Prompts submitted concurrently are collected for up to `max_wait`
+    seconds after the first one (or until `max_batch_size`), padded on
+    the left and generated in a single `generate` call on a dedicated
+    thread. Each caller streams its own row of the output.
+    """
+
+    def __init__(
+        self,
+        load_pipeline: Callable,
+        max_batch_size: int = config.HF_MAX_BATCH_SIZE,
+        max_wait: float = config.HF_BATCH_WAIT,
+        max_new_tokens: int = config.HF_MAX_NEW_TOKENS,
+    ):
+        self.load_pipeline = load_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_new_tokens = max_new_tokens
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Queue `prompt`; yields its generated text (prompt excluded).
+        """
+        request = _Request(prompt)
+        self._ensure_worker()
+        self._queue.put(request)
+        return iter(request)
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+    def _ensure_worker(self):
+        # Only started once traffic actually falls back to HF
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="hf-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            started = time.perf_counter()
+            HF_BATCH_SIZE.observe(len(batch))
+            for request in batch:
+                HF_QUEUE_WAIT.observe(started - request.enqueued_at)
+
+            try:
+                self._generate(batch)
+            except Exception as e:
+                ERRORS.inc(stage="hf_batch")
+                for request in batch:
+                    request.pieces.put(e)
+            else:
+                for request in batch:
+                    request.pieces.put(_DONE)
+
+    def _generate(self, batch: List[_Request]):
+        hf = self.load_pipeline()
+        tokenizer = hf.tokenizer
+        # Truncated to fit the model: one over-long prompt would otherwise
+        # fail every request in the batch
+        inputs = tokenizer(
+            [request.prompt for request in batch],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=hf.model.config.max_position_embeddings - self.max_new_tokens,
+        )
+        hf.model.generate(
+            **inputs,
+            streamer=_BatchStreamer(tokenizer, batch),
+            max_new_tokens=self.max_new_tokens,
+            do_sample=True,
+            pad_token_id=tokenizer.pad_token_id,
+        )
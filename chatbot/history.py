@@ -1,6 +1,14 @@
+import atexit
+import json
+import queue
 import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
+from typing import List, Optional, Tuple
+
+from chatbot.config import config
+from chatbot.metrics import ERRORS, stage
 
 # -----------------------------
 # SQLite DB setup
@@ -8,15 +16,65 @@ from datetime import datetime
 DB_PATH = Path("storage/history.db")
 DB_PATH.parent.mkdir(exist_ok=True)
 
+# Columns added after the original (timestamp, question, answer) schema
+_EXTRA_COLUMNS = {
+    "backend": "TEXT",
+    "latency_ms": "REAL",
+    "source_ids": "TEXT",
+}
+
+_STOP = object()
+
 
 class ChatHistoryStore:
-    def __init__(self):
-        # IMPORTANT: check_same_thread=False for Chainlit async safety
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    """
+    Chat history in SQLite (WAL mode).
+
+    Writes are queued and committed by a single writer thread in group
+    commits of up to `batch_size` rows, so `log` never blocks the request
+    path. Reads use one connection per thread, which WAL lets run
+    concurrently with the writer.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DB_PATH,
+        batch_size: int = config.HISTORY_BATCH_SIZE,
+        flush_interval: float = config.HISTORY_FLUSH_INTERVAL,
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+
+        self._writer_conn = self._connect(check_same_thread=False)
         self._create_table()
 
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._run_writer, name="history-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=check_same_thread
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
     def _create_table(self):
-        self.conn.execute("""
+        conn = self._writer_conn
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS chat_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT,
@@ -24,26 +82,127 @@ class ChatHistoryStore:
                 answer TEXT
             )
         """)
-        self.conn.commit()
 
-    def log(self, question: str, answer: str):
+        # Migrate databases created with the original schema
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(chat_history)")}
+        for column, column_type in _EXTRA_COLUMNS.items():
+            if column not in existing:
+                conn.execute(
+                    f"ALTER TABLE chat_history ADD COLUMN {column} {column_type}"
+                )
+
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp "
+            "ON chat_history (timestamp)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_history_backend_timestamp "
+            "ON chat_history (backend, timestamp)"
+        )
+        conn.commit()
+
+    def log(
+        self,
+        question: str,
+        answer: str,
+        backend: Optional[str] = None,
+        latency_ms: Optional[float] = None,
+        source_ids: Optional[List[str]] = None,
+    ):
         """
-        Persist each Q&A interaction.
+        Persist each Q&A interaction (queued; committed in batches).
         """
-        self.conn.execute(
-            "INSERT INTO chat_history VALUES (NULL, ?, ?, ?)",
-            (datetime.utcnow().isoformat(), question, answer)
-        )
-        self.conn.commit()
+        with stage("history_log"):
+            self._queue.put(
+                (
+                    datetime.utcnow().isoformat(),
+                    question,
+                    answer,
+                    backend,
+                    latency_ms,
+                    json.dumps(source_ids) if source_ids is not None else None,
+                )
+            )
+
+    def flush(self):
+        """
+        Block until every queued write has been committed.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _run_writer(self):
+        while True:
+            item = self._queue.get()
+            rows, events, stop = [], [], False
+
+            # Group commit: gather whatever else arrives within the window
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    rows.append(item)
+
+                if stop or len(rows) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._write(rows)
+            for event in events:
+                event.set()
+            if stop:
+                return
+
+    def _write(self, rows: List[Tuple]):
+        try:
+            with stage("history_write"), self._writer_conn:
+                self._writer_conn.executemany(
+                    """
+                    INSERT INTO chat_history
+                        (timestamp, question, answer, backend, latency_ms, source_ids)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+        except sqlite3.Error as e:
+            ERRORS.inc(stage="history_write")
+            print(f"⚠️ Failed to write {len(rows)} chat history rows")
+            print(e)
 
     def fetch_all_questions(self, limit: int = 500):
         """
         Fetch recent questions for FAQ insights.
         """
-        cursor = self.conn.cursor()
-        cursor.execute(
+        cursor = self._reader.execute(
             "SELECT question FROM chat_history ORDER BY id DESC LIMIT ?",
             (limit,)
         )
         rows = cursor.fetchall()
-        return [r[0] for r in rows]
\ No newline at end of file
+        return [r[0] for r in rows]
+
+    def fetch_between(self, start: datetime, end: datetime):
+        """
+        Fetch interactions in a time range (served by the timestamp index).
+        """
+        cursor = self._reader.execute(
+            """
+            SELECT timestamp, question, answer, backend, latency_ms, source_ids
+            FROM chat_history
+            WHERE timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp
+            """,
+            (start.isoformat(), end.isoformat()),
+        )
+        return cursor.fetchall()
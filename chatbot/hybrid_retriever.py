@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from chatbot.config import config
+from chatbot.faiss_index import search_batch, similarity
+from chatbot.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+class HybridRetriever:
+    """
+    BM25 + dense retrieval over the same chunks, fused with reciprocal
+    rank fusion.
+
+    Dense search needs a query embedding; when there is none (embedding
+    model still loading, or a short keyword query) retrieval is
+    lexical-only and costs no forward pass.
+    """
+
+    def __init__(
+        self,
+        vectorstore: FAISS,
+        lexical_index: LexicalIndex,
+        k: int = config.TOP_K,
+        candidates: int = config.HYBRID_CANDIDATES,
+    ):
+        self.vectorstore = vectorstore
+        self.lexical_index = lexical_index
+        self.k = k
+        self.candidates = max(candidates, k)
+
+    @property
+    def embedder_loaded(self) -> bool:
+        service = getattr(self.vectorstore.embeddings, "service", None)
+        return getattr(service, "loaded", True)
+
+    def is_keyword_query(self, question: str) -> bool:
+        """
+        A few vocabulary terms and nothing else, e.g. "per diem" or "INR".
+        """
+        known, unknown = self.lexical_index.known_terms(question)
+        return (
+            0 < len(known) <= config.KEYWORD_QUERY_MAX_TERMS
+            and not unknown
+            and len(known) == len(tokenize(question, keep_stopwords=True))
+        )
+
+    def needs_embedding(self, question: str) -> bool:
+        """
+        False when lexical-only retrieval is enough for `question`.
+        """
+        if self.is_keyword_query(question):
+            return False
+        if not self.embedder_loaded:
+            # Don't block on the model while it loads, if BM25 can answer
+            known, _ = self.lexical_index.known_terms(question)
+            return not known
+        return True
+
+    def search_with_score(
+        self, question: str, embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Document], Optional[float]]:
+        """
+        Fused results plus the best dense similarity (None when the
+        search was lexical-only; fused RRF scores are not comparable
+        across queries).
+        """
+        dense = None
+        if embedding is not None:
+            dense = self.vectorstore.similarity_search_with_score_by_vector(
+                embedding, k=self.candidates
+            )
+        return self._fuse(question, dense)
+
+    def search_batch(
+        self, questions: Sequence[str], embeddings: np.ndarray
+    ) -> List[Tuple[List[Document], Optional[float]]]:
+        """
+        `search_with_score` for many questions, with one FAISS call for
+        all their dense candidates.
+        """
+        dense = search_batch(self.vectorstore, embeddings, self.candidates)
+        return [self._fuse(q, hits) for q, hits in zip(questions, dense)]
+
+    def _fuse(
+        self, question: str, dense: Optional[List[Tuple[Document, float]]]
+    ) -> Tuple[List[Document], Optional[float]]:
+        lexical_ids = [
+            doc_id for doc_id, _ in self.lexical_index.search(question, self.candidates)
+        ]
+        docs: Dict[str, Document] = {
+            doc_id: self.vectorstore.docstore.search(doc_id) for doc_id in lexical_ids
+        }
+
+        if dense is None:
+            return [docs[doc_id] for doc_id in lexical_ids[:self.k]], None
+
+        dense_ids = []
+        best = None
+        for doc, distance in dense:
+            doc_id = doc.metadata.get("chunk_id", doc.page_content)
+            docs.setdefault(doc_id, doc)
+            dense_ids.append(doc_id)
+            if best is None:
+                best = similarity(distance)
+
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ids])
+        return [docs[doc_id] for doc_id in fused[:self.k]], best
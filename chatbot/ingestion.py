@@ -0,0 +1,158 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from chatbot.chunking import DocumentChunker
+from chatbot.config import config
+from chatbot.loader import MultiDocumentLoader, load_file
+from chatbot.manifest import assign_chunk_ids
+
+# (page_content, metadata): lighter to send between processes than Documents
+ChunkRecord = Tuple[str, dict]
+
+
+@lru_cache(maxsize=None)
+def _chunker(chunk_size: int, chunk_overlap: int) -> DocumentChunker:
+    return DocumentChunker(chunk_size, chunk_overlap)
+
+
+def load_and_chunk(
+    paths: List[Path], chunk_size: int, chunk_overlap: int
+) -> List[ChunkRecord]:
+    """
+    Read, chunk and id a group of files (runs in a worker process, so file
+    contents never pass through the parent).
+    """
+    splitter = _chunker(chunk_size, chunk_overlap).splitter
+    records: List[ChunkRecord] = []
+
+    for path in paths:
+        chunks = splitter.split_documents(load_file(path))
+        assign_chunk_ids(chunks)
+        records.extend((c.page_content, c.metadata) for c in chunks)
+
+    return records
+
+
+class IngestionProgress:
+    """
+    Prints throughput at most every `interval` seconds, plus a final line.
+    """
+
+    def __init__(self, total_files: int, interval: float = config.INGEST_PROGRESS_INTERVAL):
+        self.total_files = total_files
+        self.interval = interval
+        self.files = 0
+        self.chunks = 0
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def update(self, files: int, chunks: int):
+        self.files += files
+        self.chunks += chunks
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._print(now)
+
+    def done(self):
+        self._print(time.perf_counter())
+
+    def _print(self, now: float):
+        elapsed = max(now - self._start, 1e-9)
+        print(
+            f"📥 Ingested {self.files}/{self.total_files} files, "
+            f"{self.chunks} chunks ({self.files / elapsed:.0f} files/s)"
+        )
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: files -> chunks -> fixed-size chunk batches.
+
+    Groups of `files_per_task` files are read and chunked in a process
+    pool; at most two groups per worker are in flight, and results are
+    consumed in file order, so memory stays bounded regardless of corpus
+    size. Small corpora are processed inline (no pool start-up cost).
+    """
+
+    def __init__(
+        self,
+        data_dir: Path = config.DATA_DIR,
+        chunk_size: int = config.CHUNK_SIZE,
+        chunk_overlap: int = config.CHUNK_OVERLAP,
+        workers: int = config.INGEST_WORKERS,
+        batch_size: int = config.INGEST_BATCH_SIZE,
+        files_per_task: int = config.INGEST_FILES_PER_TASK,
+        progress: Optional[Callable[[int], IngestionProgress]] = IngestionProgress,
+    ):
+        self.loader = MultiDocumentLoader(data_dir)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers
+        self.batch_size = batch_size
+        self.files_per_task = files_per_task
+        self.progress = progress
+
+    def iter_batches(self) -> Iterator[List[Document]]:
+        """
+        Yield lists of at most `batch_size` chunks, ids assigned.
+        """
+        files = self.loader.list_files()
+        if not files:
+            raise ValueError("No documents loaded.")
+
+        progress = self.progress(len(files)) if self.progress else None
+        batch: List[Document] = []
+        produced = 0
+
+        for group_size, records in self._iter_groups(files):
+            produced += len(records)
+            if progress:
+                progress.update(group_size, len(records))
+
+            for text, metadata in records:
+                batch.append(Document(page_content=text, metadata=metadata))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+
+        if batch:
+            yield batch
+        if progress:
+            progress.done()
+        if not produced:
+            raise ValueError("No chunks created from documents.")
+
+    def _iter_groups(self, files: List[Path]) -> Iterator[Tuple[int, List[ChunkRecord]]]:
+        groups = [
+            files[i:i + self.files_per_task]
+            for i in range(0, len(files), self.files_per_task)
+        ]
+
+        if self.workers <= 1 or len(groups) <= 1:
+            for group in groups:
+                yield len(group), load_and_chunk(group, self.chunk_size, self.chunk_overlap)
+            return
+
+        # spawn: the app process has background threads, fork is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            pending: Deque = deque()
+            for group in groups:
+                pending.append((len(group), pool.submit(
+                    load_and_chunk, group, self.chunk_size, self.chunk_overlap
+                )))
+                if len(pending) >= 2 * self.workers:
+                    size, future = pending.popleft()
+                    yield size, future.result()
+
+            while pending:
+                size, future = pending.popleft()
+                yield size, future.result()
@@ -0,0 +1,181 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from chatbot.config import config
+from chatbot.single_flight import normalize_question
+
+# Same wording the prompt asks the LLM to use for greetings
+GREETING_REPLY = (
+    "Hello! How can I help you today? You can ask me questions about "
+    "Acme's leave policies and employee benefits programs."
+)
+
+REPLIES: Dict[str, str] = {
+    "greeting": GREETING_REPLY,
+    "thanks": (
+        "You're welcome! Let me know if you have any other questions "
+        "about Acme's HR policies."
+    ),
+    "goodbye": (
+        "Goodbye! Come back any time you have a question about Acme's "
+        "HR policies."
+    ),
+    "capabilities": (
+        "I'm Acme's HR policy assistant. I can answer questions about "
+        "leave policies, working hours, benefits and the code of conduct."
+    ),
+    "acknowledgement": (
+        "Glad I could help. Is there anything else you'd like to know "
+        "about Acme's HR policies?"
+    ),
+}
+
+# -----------------------------
+# Keyword rules
+# -----------------------------
+# Matched against the whole normalised message: "hi, how many leave days
+# do I get" starts like a greeting but is a policy question.
+_ACK_PREFIX = r"(?:(?:ok|okay|great|cool|perfect|awesome|alright) )?"
+_RULES = {
+    "greeting": (
+        r"(?:hi|hello|hey|hiya|howdy|greetings|yo|good (?:morning|afternoon|evening|day))"
+        r"(?: (?:there|all|everyone|team|bot))?"
+    ),
+    "thanks": (
+        r"(?:thanks|thank you|thx|ty|cheers|many thanks|much appreciated)"
+        r"(?: (?:so|very) much| a lot)?(?: for (?:the|your) help)?"
+    ),
+    "goodbye": (
+        r"(?:bye|bye bye|goodbye|see you|see ya|cya|good night|talk (?:to you )?later)"
+    ),
+    "capabilities": (
+        r"(?:help|who are you|what are you|what can you do|what can i ask(?: you)?"
+        r"|how does this work)"
+    ),
+    "acknowledgement": (
+        r"(?:ok|okay|k|cool|great|nice|perfect|awesome|alright|got it|sounds good)"
+    ),
+}
+_RULE_RES = {
+    intent: re.compile(rf"^{_ACK_PREFIX}{pattern}$") for intent, pattern in _RULES.items()
+}
+_NON_WORD_RE = re.compile(r"[^\w\s']+")
+
+# -----------------------------
+# Nearest-centroid examples
+# -----------------------------
+# "policy" is the counter-class: small talk must be closer to its own
+# centroid than to a typical HR question by SMALL_TALK_MARGIN.
+POLICY = "policy"
+EXAMPLES: Dict[str, List[str]] = {
+    "greeting": [
+        "hi", "hello there", "hey, how are you?", "good morning",
+        "hi, how's it going?", "hello, anyone there?",
+    ],
+    "thanks": [
+        "thank you", "thanks a lot, that helps", "great, thanks!",
+        "thanks for your help", "appreciate it",
+    ],
+    "goodbye": [
+        "bye", "see you later", "that's all, goodbye", "have a nice day",
+    ],
+    "capabilities": [
+        "what can you do?", "who are you?", "what can I ask you?",
+        "how do you work?",
+    ],
+    "acknowledgement": [
+        "ok", "got it", "cool", "makes sense", "alright then",
+    ],
+    POLICY: [
+        "How many days of annual leave do I get?",
+        "What is the maternity leave policy?",
+        "Can I carry over unused vacation days?",
+        "What are the standard working hours?",
+        "How do I claim travel expenses?",
+        "Is there a dress code?",
+        "What health insurance benefits are offered?",
+        "How do I report harassment?",
+    ],
+}
+
+
+def _clean(question: str) -> str:
+    return " ".join(_NON_WORD_RE.sub(" ", normalize_question(question)).split())
+
+
+class SmallTalkClassifier:
+    """
+    Recognises greetings, thanks and similar small talk so they can be
+    answered without retrieval or an LLM call.
+
+    Keyword rules run first and need nothing. Short messages they miss
+    are matched against per-intent centroids of example phrases,
+    embedded with the shared embedding service; that step only runs for
+    a query embedding the request computed anyway.
+    """
+
+    def __init__(
+        self,
+        embedding_service=None,
+        max_words: int = config.SMALL_TALK_MAX_WORDS,
+        threshold: float = config.SMALL_TALK_THRESHOLD,
+        margin: float = config.SMALL_TALK_MARGIN,
+    ):
+        self.embedding_service = embedding_service
+        self.max_words = max_words
+        self.threshold = threshold
+        self.margin = margin
+        self._intents: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def classify(self, question: str, embedding=None) -> Optional[str]:
+        """
+        Small-talk intent of `question` (a key of REPLIES), or None.
+        """
+        text = _clean(question)
+        if not text or len(text.split()) > self.max_words:
+            return None
+
+        for intent, rule in _RULE_RES.items():
+            if rule.match(text):
+                return intent
+
+        if embedding is None or self.embedding_service is None:
+            return None
+        return self._nearest(embedding)
+
+    def _nearest(self, embedding) -> Optional[str]:
+        query = np.asarray(embedding, dtype="float32").ravel()
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+
+        scores = self._get_centroids() @ (query / norm)
+        policy = scores[self._intents.index(POLICY)]
+        best = max(
+            (i for i, intent in enumerate(self._intents) if intent != POLICY),
+            key=lambda i: scores[i],
+        )
+        if scores[best] >= self.threshold and scores[best] - policy >= self.margin:
+            return self._intents[best]
+        return None
+
+    def _get_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    intents = list(EXAMPLES)
+                    centroids = np.vstack([
+                        self.embedding_service.encode_queries(
+                            EXAMPLES[intent], normalize=True
+                        ).mean(axis=0)
+                        for intent in intents
+                    ])
+                    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+                    self._intents = intents
+                    self._centroids = centroids
+        return self._centroids
@@ -0,0 +1,204 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chatbot.config import config
+
+LEXICAL_INDEX_FILENAME = "lexical_index.npz"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Function words only; policy vocabulary ("leave", "days", "per") is kept
+STOPWORDS = frozenset("""
+a an and are as at be but by can could do does for from had has have how
+i if in into is it its me my of on or our should so than that the their
+them then there these they this to was we what when where which who why
+will with would you your
+""".split())
+
+
+def tokenize(text: str, keep_stopwords: bool = False) -> List[str]:
+    """
+    Lowercased alphanumeric terms, without stopwords unless asked.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if keep_stopwords:
+        return tokens
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    Compact BM25 inverted index over the indexed chunks.
+
+    Postings are stored CSR-style: for term row `t`, documents
+    `doc_ids[offsets[t]:offsets[t + 1]]` with their precomputed BM25
+    impact `weights[...]`. Since idf and document lengths are fixed at
+    build time, scoring a query is a single weighted bincount.
+    Persisted as a plain .npz next to the FAISS index (no pickle).
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.ids = list(ids)
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self._term_rows: Dict[str, int] = {t: i for i, t in enumerate(terms)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # -----------------------------
+    # Build / persist
+    # -----------------------------
+    @classmethod
+    def build(
+        cls,
+        items: Iterable[Tuple[str, str]],
+        k1: float = config.BM25_K1,
+        b: float = config.BM25_B,
+    ) -> "LexicalIndex":
+        """
+        Index `(id, text)` pairs, e.g. docstore ids and chunk texts.
+        """
+        ids: List[str] = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths: List[int] = []
+
+        for doc, (doc_id, text) in enumerate(items):
+            ids.append(doc_id)
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        n_docs = len(ids)
+        doc_len = np.asarray(lengths, dtype="float32")
+        avgdl = float(doc_len.mean()) if n_docs and doc_len.mean() > 0 else 1.0
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        doc_chunks, weight_chunks = [], []
+
+        for row, term in enumerate(terms):
+            plist = postings[term]
+            docs = np.fromiter((d for d, _ in plist), dtype="int32", count=len(plist))
+            tf = np.fromiter((f for _, f in plist), dtype="float32", count=len(plist))
+
+            df = len(plist)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * doc_len[docs] / avgdl)
+
+            doc_chunks.append(docs)
+            weight_chunks.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype("float32"))
+            offsets[row + 1] = offsets[row] + df
+
+        return cls(
+            ids,
+            terms,
+            offsets,
+            np.concatenate(doc_chunks) if doc_chunks else np.zeros(0, dtype="int32"),
+            np.concatenate(weight_chunks) if weight_chunks else np.zeros(0, dtype="float32"),
+        )
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "LexicalIndex":
+        """
+        Index every chunk currently in a FAISS vectorstore's docstore.
+        """
+        docstore_ids = list(vectorstore.index_to_docstore_id.values())
+        return cls.build(
+            (doc_id, vectorstore.docstore.search(doc_id).page_content)
+            for doc_id in docstore_ids
+        )
+
+    def save(self, directory: Path):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self._term_rows, key=self._term_rows.get)
+        np.savez(
+            directory / LEXICAL_INDEX_FILENAME,
+            ids=np.asarray(self.ids, dtype=str),
+            terms=np.asarray(terms, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+        )
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["LexicalIndex"]:
+        path = Path(directory) / LEXICAL_INDEX_FILENAME
+        if not path.exists():
+            return None
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["ids"].tolist(),
+                data["terms"].tolist(),
+                data["offsets"],
+                data["doc_ids"],
+                data["weights"],
+            )
+
+    # -----------------------------
+    # Query
+    # -----------------------------
+    def known_terms(self, query: str) -> Tuple[List[str], List[str]]:
+        """
+        Split the query's terms into (in vocabulary, unknown).
+        """
+        known, unknown = [], []
+        for term in tokenize(query):
+            (known if term in self._term_rows else unknown).append(term)
+        return known, unknown
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Top-`k` `(id, bm25 score)` pairs for `query`, best first.
+        """
+        rows = [
+            self._term_rows[t] for t in tokenize(query) if t in self._term_rows
+        ]
+        if not rows or not self.ids:
+            return []
+
+        docs = np.concatenate(
+            [self.doc_ids[self.offsets[r]:self.offsets[r + 1]] for r in rows]
+        )
+        weights = np.concatenate(
+            [self.weights[self.offsets[r]:self.offsets[r + 1]] for r in rows]
+        )
+        scores = np.bincount(docs, weights=weights, minlength=len(self.ids))
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = config.RRF_K
+) -> List[str]:
+    """
+    Fuse several best-first id rankings: score(d) = sum 1 / (k + rank).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda d: -scores[d])
@@ -1,18 +1,33 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
 import requests
-from typing import Tuple
+from typing import AsyncIterator, Callable, Iterator, Optional, Tuple, Union
+
+from chatbot.backend_router import BackendRouter, NoBackendAvailable
+from chatbot.config import config
+from chatbot.executors import iterate_in_thread, run_cpu, run_io
+from chatbot.hf_batcher import HFMicroBatcher
+from chatbot.metrics import ERRORS, GENERATION_LATENCY, LLM_REQUESTS, stage
+from chatbot.ollama_utils import model_manager
 
 # -----------------------------
 # Ollama Configuration
 # -----------------------------
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
-OLLAMA_MODEL = "mistral"
+# Model name and keep_alive come from the lifecycle manager, which also
+# sees every reply to report model loads (ollama_utils.OllamaModelManager)
+OLLAMA_MODEL = model_manager.model
 
 # -----------------------------
 # HuggingFace Fallback
 # -----------------------------
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-
+# NOTE: transformers is imported inside the functions below; importing
+# it (and torch) at module load adds seconds to every cold start.
 HF_MODEL_NAME = "distilgpt2"
 
 
@@ -39,16 +54,92 @@ def ollama_generate(prompt: str) -> str:
     """
     response = requests.post(
         OLLAMA_URL,
-        json={
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-        },
+        json=model_manager.payload(prompt, stream=False),
         timeout=60,
     )
 
     response.raise_for_status()
-    return response.json()["response"]
+    reply = response.json()
+    model_manager.observe(reply)
+    return reply["response"]
+
+
+async def aollama_available() -> bool:
+    """
+    Async variant of `ollama_available`.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=2) as client:
+            await client.get(OLLAMA_TAGS_URL)
+        return True
+    except Exception:
+        return False
+
+
+async def aollama_generate(prompt: str) -> str:
+    """
+    Async variant of `ollama_generate`: waits on the socket instead of
+    blocking the event loop.
+    """
+    async with httpx.AsyncClient(timeout=60) as client:
+        response = await client.post(
+            OLLAMA_URL,
+            json=model_manager.payload(prompt, stream=False),
+        )
+
+    response.raise_for_status()
+    reply = response.json()
+    model_manager.observe(reply)
+    return reply["response"]
+
+
+# -----------------------------
+# Ollama Streaming
+# -----------------------------
+def ollama_stream(prompt: str) -> Iterator[str]:
+    """
+    Yield tokens from Ollama's NDJSON stream as they are generated.
+    """
+    with requests.post(
+        OLLAMA_URL,
+        json=model_manager.payload(prompt, stream=True),
+        stream=True,
+        timeout=60,
+    ) as response:
+        response.raise_for_status()
+
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                model_manager.observe(chunk)
+                break
+
+
+async def aollama_stream(prompt: str) -> AsyncIterator[str]:
+    """
+    Async variant of `ollama_stream`.
+    """
+    async with httpx.AsyncClient(timeout=60) as client:
+        async with client.stream(
+            "POST",
+            OLLAMA_URL,
+            json=model_manager.payload(prompt, stream=True),
+        ) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    model_manager.observe(chunk)
+                    break
 
 
 # -----------------------------
@@ -56,33 +147,129 @@ def ollama_generate(prompt: str) -> str:
 # -----------------------------
 # NOTE: Loaded lazily to avoid slow startup if Ollama exists
 _hf_pipeline = None
+_hf_lock = threading.Lock()
+
+
+def _get_hf_pipeline():
+    global _hf_pipeline
+
+    # Guarded: executor threads may race on the first fallback call
+    with _hf_lock:
+        if _hf_pipeline is None:
+            from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+
+            tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
+            # Batched generation: decoder-only models need left padding
+            tokenizer.padding_side = "left"
+            # Over-long prompts lose their beginning, not the question
+            tokenizer.truncation_side = "left"
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            model = AutoModelForCausalLM.from_pretrained(HF_MODEL_NAME)
+
+            _hf_pipeline = pipeline(
+                "text-generation",
+                model=model,
+                tokenizer=tokenizer,
+                max_new_tokens=config.HF_MAX_NEW_TOKENS,
+            )
+
+    return _hf_pipeline
+
+
+# Concurrent fallback requests are generated together in micro-batches
+_hf_batcher = HFMicroBatcher(_get_hf_pipeline)
 
 
 def hf_generate(prompt: str) -> str:
     """
     Generate response using HuggingFace local model (distilgpt2).
     """
-    global _hf_pipeline
+    return _hf_batcher.generate(prompt)
 
-    if _hf_pipeline is None:
-        tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_NAME)
-        model = AutoModelForCausalLM.from_pretrained(HF_MODEL_NAME)
 
-        _hf_pipeline = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            max_new_tokens=256,
-        )
+def hf_stream(prompt: str) -> Iterator[str]:
+    """
+    Yield decoded text pieces from the HuggingFace model as the
+    micro-batch containing `prompt` is generated.
+    """
+    yield from _hf_batcher.stream(prompt)
+
+
+# -----------------------------
+# Backend Routing
+# -----------------------------
+# Priority order; health is cached and each backend has a circuit breaker
+router = BackendRouter(
+    backends=["ollama", "huggingface"],
+    health_checks={"ollama": ollama_available},
+)
+
+
+def preferred_backend() -> Optional[str]:
+    """
+    Backend the next request will most likely use (see BackendRouter.preferred).
+    """
+    return router.preferred()
 
-    output = _hf_pipeline(prompt, do_sample=True)
-    return output[0]["generated_text"]
+
+def _record(backend: str, latency: float, ok: bool, complete: bool = True):
+    """
+    Feed one backend call into the router (health / circuit breaker)
+    and the metrics registry. A stream the consumer stopped reading
+    (`complete=False`) counts as served but not towards latency.
+    """
+    router.record(backend, latency, ok=ok)
+    if not ok:
+        LLM_REQUESTS.inc(backend=backend, outcome="error")
+        ERRORS.inc(stage=f"generation_{backend}")
+    elif complete:
+        LLM_REQUESTS.inc(backend=backend, outcome="ok")
+        GENERATION_LATENCY.observe(latency, backend=backend)
+    else:
+        LLM_REQUESTS.inc(backend=backend, outcome="abandoned")
+
+
+_GENERATORS = {
+    "ollama": ollama_generate,
+    "huggingface": hf_generate,
+}
+
+
+async def _ahf_generate(prompt: str) -> str:
+    # Generation runs on the batcher thread; this only waits for it
+    return await run_io(hf_generate, prompt)
+
+
+_ASYNC_GENERATORS = {
+    "ollama": aollama_generate,
+    "huggingface": _ahf_generate,
+}
+
+_STREAMERS = {
+    "ollama": ollama_stream,
+    "huggingface": hf_stream,
+}
+
+_ASYNC_STREAMERS = {
+    "ollama": aollama_stream,
+    "huggingface": lambda prompt: iterate_in_thread(hf_stream(prompt)),
+}
 
 
 # -----------------------------
 # Unified Interface
 # -----------------------------
-def generate_response(prompt: str) -> Tuple[str, str]:
+# A prompt is either final text or a factory called with the backend name,
+# so it can be fitted to that backend's context window.
+Prompt = Union[str, Callable[[str], str]]
+
+
+def _render(prompt: Prompt, backend: str) -> str:
+    return prompt(backend) if callable(prompt) else prompt
+
+
+def generate_response(prompt: Prompt) -> Tuple[str, str]:
     """
     Returns:
         answer (str)
@@ -90,8 +277,138 @@ def generate_response(prompt: str) -> Tuple[str, str]:
     Priority:
         1. Ollama (Mistral)
         2. HuggingFace (distilgpt2)
+    A backend that fails mid-call is recorded and the next one is tried.
     """
-    if ollama_available():
-        return ollama_generate(prompt), "ollama"
+    error = None
+
+    with stage("generation"):
+        for backend in router.candidates():
+            start = time.perf_counter()
+            try:
+                answer = _GENERATORS[backend](_render(prompt, backend))
+            except Exception as e:
+                _record(backend, time.perf_counter() - start, ok=False)
+                error = e
+                continue
+
+            _record(backend, time.perf_counter() - start, ok=True)
+            return answer, backend
+
+    raise NoBackendAvailable("No LLM backend could serve the request") from error
+
+
+async def agenerate_response(prompt: Prompt) -> Tuple[str, str]:
+    """
+    Async variant of `generate_response`. The HuggingFace fallback runs
+    on the micro-batcher's thread; this only waits for it on the I/O
+    executor.
+    """
+    if router.needs_blocking_check():
+        await run_io(router.check_unknown)
+
+    error = None
+
+    with stage("generation"):
+        for backend in router.candidates():
+            start = time.perf_counter()
+            try:
+                # Prompt packing counts tokens (and may load a tokenizer)
+                rendered = await run_cpu(_render, prompt, backend)
+                answer = await _ASYNC_GENERATORS[backend](rendered)
+            except Exception as e:
+                _record(backend, time.perf_counter() - start, ok=False)
+                error = e
+                continue
+
+            _record(backend, time.perf_counter() - start, ok=True)
+            return answer, backend
+
+    raise NoBackendAvailable("No LLM backend could serve the request") from error
+
+
+def _recorded_stream(backend: str, first: str, tokens: Iterator[str], start: float) -> Iterator[str]:
+    try:
+        if first:
+            yield first
+        yield from tokens
+    except GeneratorExit:
+        # The consumer stopped early (client gone): not a backend failure
+        _record(backend, time.perf_counter() - start, ok=True, complete=False)
+        raise
+    except Exception:
+        _record(backend, time.perf_counter() - start, ok=False)
+        raise
     else:
-        return hf_generate(prompt), "huggingface"
\ No newline at end of file
+        _record(backend, time.perf_counter() - start, ok=True)
+
+
+async def _arecorded_stream(
+    backend: str, first: str, tokens: AsyncIterator[str], start: float
+) -> AsyncIterator[str]:
+    try:
+        if first:
+            yield first
+        async for token in tokens:
+            yield token
+    except (GeneratorExit, asyncio.CancelledError):
+        # Disconnect or cancellation: not a backend failure
+        _record(backend, time.perf_counter() - start, ok=True, complete=False)
+        raise
+    except Exception:
+        _record(backend, time.perf_counter() - start, ok=False)
+        raise
+    else:
+        _record(backend, time.perf_counter() - start, ok=True)
+
+
+def stream_response(prompt: Prompt) -> Tuple[Iterator[str], str]:
+    """
+    Streaming variant of `generate_response`.
+    Returns:
+        token iterator
+        backend_used (str)
+    Falls back to the next backend if one fails before its first token.
+    """
+    error = None
+
+    for backend in router.candidates():
+        start = time.perf_counter()
+        tokens = _STREAMERS[backend](_render(prompt, backend))
+        try:
+            with stage("time_to_first_token"):
+                first = next(tokens, "")
+        except Exception as e:
+            _record(backend, time.perf_counter() - start, ok=False)
+            error = e
+            continue
+
+        return _recorded_stream(backend, first, tokens, start), backend
+
+    raise NoBackendAvailable("No LLM backend could serve the request") from error
+
+
+async def astream_response(prompt: Prompt) -> Tuple[AsyncIterator[str], str]:
+    """
+    Async variant of `stream_response`.
+    """
+    if router.needs_blocking_check():
+        await run_io(router.check_unknown)
+
+    error = None
+
+    for backend in router.candidates():
+        start = time.perf_counter()
+        tokens = _ASYNC_STREAMERS[backend](await run_cpu(_render, prompt, backend))
+        try:
+            with stage("time_to_first_token"):
+                first = await tokens.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except Exception as e:
+            _record(backend, time.perf_counter() - start, ok=False)
+            error = e
+            continue
+
+        return _arecorded_stream(backend, first, tokens, start), backend
+
+    raise NoBackendAvailable("No LLM backend could serve the request") from error
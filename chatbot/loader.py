@@ -1,10 +1,24 @@
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 from langchain_core.documents import Document
 from langchain_community.document_loaders import TextLoader
 
 from chatbot.config import config
+from chatbot.manifest import content_hash
+
+
+def load_file(file_path: Path) -> List[Document]:
+    """
+    Load one .txt policy file, tagged with its source name and hash.
+    """
+    docs = TextLoader(str(file_path), encoding="utf-8").load()
+
+    for doc in docs:
+        doc.metadata["source"] = file_path.name
+        doc.metadata["file_hash"] = content_hash(doc.page_content)
+
+    return docs
 
 
 class MultiDocumentLoader:
@@ -20,20 +34,26 @@ class MultiDocumentLoader:
                 f"Data directory not found: {self.data_dir}"
             )
 
-    def load_documents(self) -> List[Document]:
-        documents: List[Document] = []
-
-        for file_path in self.data_dir.iterdir():
-            if file_path.suffix.lower() == ".txt":
-                loader = TextLoader(str(file_path), encoding="utf-8")
-                docs = loader.load()
+    def list_files(self) -> List[Path]:
+        """
+        Policy files in a stable order.
+        """
+        return sorted(
+            path for path in self.data_dir.iterdir()
+            if path.suffix.lower() == ".txt"
+        )
+
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Yield documents one file at a time (bounded memory).
+        """
+        for file_path in self.list_files():
+            yield from load_file(file_path)
 
-                for doc in docs:
-                    doc.metadata["source"] = file_path.name
-
-                documents.extend(docs)
+    def load_documents(self) -> List[Document]:
+        documents: List[Document] = list(self.iter_documents())
 
         if not documents:
             raise ValueError("No documents loaded.")
 
-        return documents
\ No newline at end of file
+        return documents
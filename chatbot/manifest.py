@@ -0,0 +1,137 @@
+import hashlib
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def content_hash(text: str) -> str:
+    """
+    Stable SHA-256 hex digest of a text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(chunks: List[Document]) -> List[str]:
+    """
+    Derive a content-addressed id for every chunk and store it in
+    `metadata["chunk_id"]`.
+
+    The id hashes the source file name together with the chunk text, so an
+    unchanged chunk keeps its id across rebuilds. Identical chunks within the
+    same file get an occurrence suffix to stay unique.
+    """
+    seen: Dict[str, int] = defaultdict(int)
+    ids: List[str] = []
+
+    for chunk in chunks:
+        source = chunk.metadata.get("source", "")
+        base = content_hash(f"{source}\x00{chunk.page_content}")
+        occurrence = seen[base]
+        seen[base] += 1
+
+        chunk_id = base if occurrence == 0 else f"{base}-{occurrence}"
+        chunk.metadata["chunk_id"] = chunk_id
+        ids.append(chunk_id)
+
+    return ids
+
+
+class IndexManifest:
+    """
+    Describes what is inside a persisted vectorstore: the settings it was
+    built with (including the FAISS index spec) and, per source file, the
+    file hash and its chunk ids.
+    """
+
+    def __init__(
+        self,
+        embedding_model: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        files: Dict[str, Dict],
+        faiss_index: str = "flat",
+    ):
+        self.embedding_model = embedding_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.files = files
+        self.faiss_index = faiss_index
+
+    def add_chunks(self, chunks: List[Document]):
+        """
+        Record chunks whose ids are already assigned (streaming ingestion
+        adds them batch by batch).
+        """
+        for chunk in chunks:
+            source = chunk.metadata.get("source", "")
+            entry = self.files.setdefault(
+                source,
+                {"hash": chunk.metadata.get("file_hash"), "chunks": []},
+            )
+            entry["chunks"].append(chunk.metadata["chunk_id"])
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["IndexManifest"]:
+        path = Path(directory) / MANIFEST_FILENAME
+        if not path.exists():
+            return None
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            embedding_model=data["embedding_model"],
+            chunk_size=data["chunk_size"],
+            chunk_overlap=data["chunk_overlap"],
+            files=data["files"],
+            # Manifests written before index types were configurable
+            faiss_index=data.get("faiss_index", "flat"),
+        )
+
+    def save(self, directory: Path):
+        path = Path(directory) / MANIFEST_FILENAME
+        path.write_text(
+            json.dumps(
+                {
+                    "embedding_model": self.embedding_model,
+                    "chunk_size": self.chunk_size,
+                    "chunk_overlap": self.chunk_overlap,
+                    "faiss_index": self.faiss_index,
+                    "files": self.files,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+    def settings_match(self, other: "IndexManifest") -> bool:
+        """
+        Chunks and vectors are only reusable when they were produced with
+        the same embedding model and chunking parameters, and the index
+        with the same FAISS index spec.
+        """
+        return (
+            self.embedding_model == other.embedding_model
+            and self.chunk_size == other.chunk_size
+            and self.chunk_overlap == other.chunk_overlap
+            and self.faiss_index == other.faiss_index
+        )
+
+    def chunk_ids(self) -> List[str]:
+        return [cid for entry in self.files.values() for cid in entry["chunks"]]
+
+    def fingerprint(self) -> str:
+        """
+        Hash identifying the exact index contents; changes whenever any
+        chunk, the embedding model or the chunking settings change.
+        """
+        return content_hash(
+            "\n".join(
+                [self.embedding_model, str(self.chunk_size), str(self.chunk_overlap)]
+                + sorted(self.chunk_ids())
+            )
+        )
@@ -0,0 +1,221 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# -----------------------------
+# Minimal Prometheus-style metrics
+# -----------------------------
+# Recording is a dict lookup plus an increment under a lock; text
+# rendering only happens when /metrics is scraped.
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Tracing span: observe the wall time of the `with` block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# -----------------------------
+# Application metrics
+# -----------------------------
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "hr_rag_stage_seconds",
+    "Latency of request pipeline stages.",
+    labelnames=("stage",),
+))
+
+GENERATION_LATENCY = REGISTRY.register(Histogram(
+    "hr_rag_generation_seconds",
+    "LLM generation latency per backend.",
+    labelnames=("backend",),
+))
+
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "hr_rag_llm_requests_total",
+    "LLM calls per backend and outcome.",
+    labelnames=("backend", "outcome"),
+))
+
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "hr_rag_cache_lookups_total",
+    "Semantic answer cache lookups by result.",
+    labelnames=("result",),
+))
+
+RETRIEVAL_SCORE = REGISTRY.register(Histogram(
+    "hr_rag_retrieval_score",
+    "Best dense similarity per retrieval (input to the confidence gate).",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+))
+
+LLM_SKIPPED = REGISTRY.register(Counter(
+    "hr_rag_llm_skipped_total",
+    "Requests answered without calling an LLM (cache hit, small talk, low retrieval confidence).",
+    labelnames=("reason", "intent"),
+))
+
+OLLAMA_MODEL_LOADS = REGISTRY.register(Counter(
+    "hr_rag_ollama_model_loads_total",
+    "Times Ollama had to load the model into memory, by what triggered it.",
+    labelnames=("trigger",),
+))
+
+OLLAMA_LOAD_SECONDS = REGISTRY.register(Histogram(
+    "hr_rag_ollama_model_load_seconds",
+    "Ollama model load time as reported by the server.",
+))
+
+EMBEDDING_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "hr_rag_embedding_cache_lookups_total",
+    "Texts looked up in the persistent embedding cache by result.",
+    labelnames=("result",),
+))
+
+HF_BATCH_SIZE = REGISTRY.register(Histogram(
+    "hr_rag_hf_batch_size",
+    "Prompts per HuggingFace micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32),
+))
+
+HF_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "hr_rag_hf_queue_wait_seconds",
+    "Time a prompt waits for its HuggingFace micro-batch to start.",
+))
+
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "hr_rag_coalesced_requests_total",
+    "Requests that joined an identical in-flight request instead of running their own.",
+    labelnames=("mode",),
+))
+
+ERRORS = REGISTRY.register(Counter(
+    "hr_rag_errors_total",
+    "Errors by pipeline stage.",
+    labelnames=("stage",),
+))
+
+
+def stage(name: str):
+    """
+    Span around one pipeline stage: `with stage("retrieval"): ...`
+    """
+    return STAGE_LATENCY.time(stage=name)
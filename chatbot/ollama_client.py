@@ -1,16 +1,41 @@
+import json
+from typing import Iterator
+
 import requests
 
+from chatbot.ollama_utils import model_manager
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
 
-def generate(prompt: str, model: str = "mistral") -> str:
+def generate(prompt: str, model: str = model_manager.model) -> str:
     response = requests.post(
         OLLAMA_URL,
-        json={
-            "model": model,
-            "prompt": prompt,
-            "stream": False
-        },
+        json=model_manager.payload(prompt, stream=False, model=model),
         timeout=120
     )
     response.raise_for_status()
-    return response.json()["response"]
\ No newline at end of file
+    reply = response.json()
+    model_manager.observe(reply)
+    return reply["response"]
+
+
+def stream(prompt: str, model: str = model_manager.model) -> Iterator[str]:
+    """
+    Yield tokens from Ollama's NDJSON stream.
+    """
+    with requests.post(
+        OLLAMA_URL,
+        json=model_manager.payload(prompt, stream=True, model=model),
+        stream=True,
+        timeout=120
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                model_manager.observe(chunk)
+                break
@@ -1,11 +1,21 @@
 import subprocess
+import threading
 import time
+from typing import Dict, Optional, Union
+
 import requests
 
+from chatbot.config import config
+from chatbot.metrics import ERRORS, OLLAMA_LOAD_SECONDS, OLLAMA_MODEL_LOADS
+
 
 OLLAMA_BASE_URL = "http://localhost:11434"
 MODEL_NAME = "mistral"
 
+# Ollama reports load_duration on every reply; a resident model takes
+# milliseconds, anything above this means it was (re)loaded
+_LOAD_THRESHOLD = 0.25
+
 
 def is_ollama_running() -> bool:
     try:
@@ -25,12 +35,25 @@ def start_ollama_server():
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
-        time.sleep(3)
     except FileNotFoundError:
         raise RuntimeError(
             "Ollama is not installed. Please install from https://ollama.com/download"
         )
 
+    wait_for_server()
+
+
+def wait_for_server(timeout: float = 15.0, interval: float = 0.25) -> bool:
+    """
+    Poll until the server answers instead of sleeping a fixed time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_ollama_running():
+            return True
+        time.sleep(interval)
+    return False
+
 
 def ensure_model_available(model_name: str = MODEL_NAME):
     """
@@ -49,13 +72,139 @@ def ensure_model_available(model_name: str = MODEL_NAME):
         )
 
 
+# -----------------------------
+# Model lifecycle (warm-up / keep-alive)
+# -----------------------------
+def _keep_alive(value: Union[str, int]) -> Union[str, int]:
+    """
+    Ollama parses string keep_alive values as Go durations, which need a
+    unit: send unitless ones ("-1", "600") as seconds instead.
+    """
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+class OllamaModelManager:
+    """
+    Keeps the Ollama model resident so time-to-first-answer does not
+    depend on how long the app has been idle.
+
+    - `warm_up` loads the model with a one-token generation at startup.
+    - Every generation request carries `keep_alive` (see `payload`).
+    - A background thread re-sends `keep_alive` (an empty prompt, which
+      only loads / pins the model) after `refresh_interval` idle seconds.
+    - Replies are passed to `observe`, which reports every model load
+      (print + hr_rag_ollama_model_loads_total).
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        model: str = MODEL_NAME,
+        keep_alive: Union[str, int] = config.OLLAMA_KEEP_ALIVE,
+        refresh_interval: float = config.OLLAMA_REFRESH_INTERVAL,
+        warmup_prompt: str = config.OLLAMA_WARMUP_PROMPT,
+    ):
+        self.url = f"{base_url}/api/generate"
+        self.model = model
+        self.keep_alive = _keep_alive(keep_alive)
+        self.refresh_interval = refresh_interval
+        self.warmup_prompt = warmup_prompt
+        self.last_used = time.monotonic()
+        self.last_load: Optional[Dict] = None
+        self._refresher = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def payload(self, prompt: str, stream: bool = False, **extra) -> Dict:
+        """
+        Request body for /api/generate, with this manager's keep_alive.
+        """
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            **extra,
+        }
+
+    def observe(self, reply: Dict, trigger: str = "request"):
+        """
+        Record a (final) /api/generate reply: marks activity and reports
+        a model load if the server had to perform one.
+        """
+        self.last_used = time.monotonic()
+        load_seconds = reply.get("load_duration", 0) / 1e9
+        if load_seconds < _LOAD_THRESHOLD:
+            return
+
+        self.last_load = {"trigger": trigger, "seconds": load_seconds, "at": time.time()}
+        OLLAMA_MODEL_LOADS.inc(trigger=trigger)
+        OLLAMA_LOAD_SECONDS.observe(load_seconds)
+        print(f"🔥 Ollama loaded '{self.model}' in {load_seconds:.1f}s ({trigger})")
+
+    def warm_up(self):
+        """
+        Load the model now with a short generation (startup).
+        """
+        response = requests.post(
+            self.url,
+            json=self.payload(self.warmup_prompt, options={"num_predict": 1}),
+            timeout=300,
+        )
+        response.raise_for_status()
+        self.observe(response.json(), trigger="warmup")
+
+    def refresh(self):
+        """
+        Re-send keep_alive without generating; reloads the model if the
+        server dropped it (restart, memory pressure).
+        """
+        try:
+            response = requests.post(self.url, json=self.payload(""), timeout=300)
+            response.raise_for_status()
+            self.observe(response.json(), trigger="refresh")
+        except requests.exceptions.RequestException:
+            # Server down: the router falls back; retry after another interval
+            ERRORS.inc(stage="ollama_keepalive")
+            self.last_used = time.monotonic()
+
+    def start_refresher(self):
+        if self.refresh_interval <= 0:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self._run, name="ollama-keepalive", daemon=True
+                )
+                self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            idle = time.monotonic() - self.last_used
+            if idle >= self.refresh_interval:
+                self.refresh()
+                continue
+            self._stop.wait(self.refresh_interval - idle)
+
+
+model_manager = OllamaModelManager()
+
+
 def ensure_ollama_ready():
     """
     Full bootstrap:
     - Start server if not running
     - Pull model if missing
+    - Load it into memory and keep it there
     """
     if not is_ollama_running():
         start_ollama_server()
 
-    ensure_model_available()
\ No newline at end of file
+    ensure_model_available()
+    model_manager.warm_up()
+    model_manager.start_refresher()
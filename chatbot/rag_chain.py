@@ -1,10 +1,103 @@
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    AsyncIterator, Callable, Dict, Any, List, Optional, Sequence, Tuple,
+)
+
+import numpy as np
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 
 from chatbot.config import config
-from chatbot.llm_factory import generate_response
+from chatbot.context_packer import ContextPacker, context_budget, get_token_counter
+from chatbot.executors import run_cpu, run_io
+from chatbot.faiss_index import search_batch, similarity
+from chatbot.hybrid_retriever import HybridRetriever
+from chatbot.intent import REPLIES, SmallTalkClassifier
+from chatbot.lexical_index import LexicalIndex
+from chatbot.llm_factory import (
+    agenerate_response,
+    astream_response,
+    generate_response,
+    preferred_backend,
+)
+from chatbot.metrics import (
+    CACHE_LOOKUPS,
+    COALESCED_REQUESTS,
+    LLM_SKIPPED,
+    RETRIEVAL_SCORE,
+    STAGE_LATENCY,
+    stage,
+)
+from chatbot.semantic_cache import SemanticCache
+from chatbot.single_flight import (
+    AsyncSingleFlight,
+    SingleFlight,
+    StreamFlights,
+    normalize_question,
+)
+
+
+NOT_IN_POLICY_ANSWER = (
+    "Sorry, I don't have an answer to this as it is not specified in the policy."
+)
+
+
+async def _single(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _spanned(
+    tokens: AsyncIterator[str], started: float, name: str
+) -> AsyncIterator[str]:
+    """
+    `tokens`, observed as stage `name` from `started` to the last token.
+    """
+    try:
+        async for token in tokens:
+            yield token
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage=name)
+
+
+class StreamingAnswer:
+    """
+    An answer whose text arrives token by token.
+
+    Iterate with `async for`; `answer` holds the full text once the
+    stream has been consumed.
+    """
+
+    def __init__(
+        self,
+        question: str,
+        sources: List[Document],
+        tokens: AsyncIterator[str],
+        backend: str,
+    ):
+        self.question = question
+        self.sources = sources
+        self.backend = backend
+        self._tokens = tokens
+        self._parts: List[str] = []
+
+    async def __aiter__(self):
+        async for token in self._tokens:
+            self._parts.append(token)
+            yield token
+
+    @property
+    def answer(self) -> str:
+        return "".join(self._parts).strip()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "sources": self.sources,
+            "backend": self.backend,
+        }
 
 
 class HRPolicyRAG:
@@ -13,30 +106,82 @@ class HRPolicyRAG:
     for answering HR policy questions.
     """
 
-    def __init__(self, vectorstore: FAISS):
-        # Retriever setup
-        self.retriever = vectorstore.as_retriever(
-            search_kwargs={"k": config.TOP_K}
+    def __init__(
+        self,
+        vectorstore: FAISS,
+        cache: Optional[SemanticCache] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+    ):
+        self.vectorstore = vectorstore
+        # Optional BM25 + dense fusion (dense-only without a lexical index)
+        self.hybrid = (
+            HybridRetriever(vectorstore, lexical_index)
+            if lexical_index is not None else None
+        )
+        # Optional semantic answer cache (skips retrieval + generation)
+        self.cache = cache
+        # Greetings / thanks / ... are answered directly, no LLM call
+        self.small_talk = (
+            SmallTalkClassifier(getattr(vectorstore.embeddings, "service", None))
+            if config.SMALL_TALK_ENABLED else None
+        )
+        # Below this best-chunk similarity the LLM is not called at all
+        self.min_score = (
+            config.RETRIEVAL_MIN_SCORE if config.RETRIEVAL_GATE_ENABLED else None
         )
+        # Single-flight coalescing of identical in-flight questions
+        self.coalesce = config.REQUEST_COALESCING
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        self._streams = StreamFlights()
+        # Merges overlapping chunks and fits the context to the backend
+        self.packer = ContextPacker()
 
-    def _build_context(self, docs: List[Document]) -> str:
+    def _build_context(
+        self,
+        docs: List[Document],
+        backend: Optional[str] = None,
+        reserved_tokens: int = 0,
+    ) -> str:
         """
         Combine retrieved documents into a single context string.
+
+        Overlapping chunks are merged; with a `backend`, the context is
+        fitted to that backend's token budget minus `reserved_tokens`
+        (the rest of the prompt).
         """
-        return "\n\n".join(doc.page_content for doc in docs)
+        if backend is None:
+            return self.packer.pack(docs)
 
-    def answer(self, question: str) -> Dict[str, Any]:
+        count_tokens = get_token_counter(backend)
+        return self.packer.pack(
+            docs,
+            budget_tokens=context_budget(backend) - reserved_tokens,
+            count_tokens=count_tokens,
+        )
+
+    def _build_prompt(
+        self,
+        question: str,
+        docs: List[Document],
+        backend: Optional[str] = None,
+    ) -> str:
         """
-        Generate an answer for the given question using RAG.
+        Fill the prompt template with the retrieved context.
         """
-        # Retrieve relevant documents
-        docs = self.retriever.invoke(question)
+        with stage("prompt_build"):
+            reserved = 0
+            if backend is not None:
+                reserved = get_token_counter(backend)(
+                    self._render_prompt(question, "")
+                )
+            context = self._build_context(docs, backend, reserved)
 
-        # Build context
-        context = self._build_context(docs)
+            return self._render_prompt(question, context)
 
-        # Prompt template
-        prompt = f"""
+    @staticmethod
+    def _render_prompt(question: str, context: str) -> str:
+        return f"""
 You are an HR policy assistant for Acme Corporation.
 
 Rules:
@@ -44,7 +189,7 @@ Rules:
   "Hello! How can I help you today? You can ask me questions about Acme's leave policies and employee benefits programs."
 - Answer the question strictly using the context below.
 - If the answer is NOT present in the context, respond with:
-  "Sorry, I don't have an answer to this as it is not specified in the policy."
+  "{NOT_IN_POLICY_ANSWER}"
 
 Context:
 {context}
@@ -55,12 +200,477 @@ Question:
 Answer:
 """
 
+    def _prompt_for(self, question: str, docs: List[Document]):
+        """
+        Prompt factory for llm_factory: packed per serving backend.
+        """
+        return lambda backend: self._build_prompt(question, docs, backend)
+
+    def _small_talk(
+        self, question: str, embedding: Optional[List[float]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Direct reply when `question` is small talk (keyword rules; with an
+        `embedding`, also the nearest intent centroid).
+        """
+        if self.small_talk is None:
+            return None
+
+        with stage("intent"):
+            intent = self.small_talk.classify(question, embedding)
+        if intent is None:
+            return None
+
+        LLM_SKIPPED.inc(reason="small_talk", intent=intent)
+        return {
+            "question": question,
+            "answer": REPLIES[intent],
+            "sources": [],
+            "backend": "small_talk",
+        }
+
+    def _lookup(
+        self, question: str
+    ) -> Tuple[Optional[List[float]], Optional[Dict[str, Any]]]:
+        """
+        Embed the question once; use it to spot small talk and to check
+        the semantic cache. The second value is a ready response, if any.
+
+        Returns no embedding when lexical-only retrieval suffices
+        (keyword query, or the embedding model is still loading).
+        """
+        if self.hybrid is not None and not self.hybrid.needs_embedding(question):
+            return None, None
+
+        with stage("query_embedding"):
+            embedding = self.vectorstore.embeddings.embed_query(question)
+
+        return embedding, self._ready_response(question, embedding)
+
+    def _ready_response(
+        self, question: str, embedding: List[float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Small-talk reply or semantic-cache hit for an embedded question.
+        """
+        reply = self._small_talk(question, embedding)
+        if reply is not None:
+            return reply
+
+        cached = None
+        if self.cache is not None:
+            with stage("cache_lookup"):
+                cached = self.cache.lookup(embedding)
+            CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+
+        if cached is not None:
+            LLM_SKIPPED.inc(reason="cache")
+            cached["question"] = question
+            cached["backend"] = "cache"
+
+        return cached
+
+    def _retrieve(
+        self, question: str, embedding: Optional[List[float]]
+    ) -> Tuple[List[Document], Optional[float]]:
+        """
+        Retrieved chunks and the best dense similarity (None when the
+        search was lexical-only).
+        """
+        with stage("retrieval"):
+            if self.hybrid is not None:
+                docs, score = self.hybrid.search_with_score(question, embedding)
+            else:
+                scored = self.vectorstore.similarity_search_with_score_by_vector(
+                    embedding, k=config.TOP_K
+                )
+                docs = [doc for doc, _ in scored]
+                score = similarity(scored[0][1]) if scored else None
+
+        if score is not None:
+            RETRIEVAL_SCORE.observe(score)
+        return docs, score
+
+    def _gate(
+        self, question: str, docs: List[Document], score: Optional[float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The fixed not-in-policy response when nothing relevant was
+        retrieved (no chunks, or best score below RETRIEVAL_MIN_SCORE).
+        """
+        if self.min_score is None:
+            return None
+        if docs and (score is None or score >= self.min_score):
+            return None
+
+        LLM_SKIPPED.inc(reason="low_confidence")
+        return {
+            "question": question,
+            "answer": NOT_IN_POLICY_ANSWER,
+            "sources": [],
+            "backend": "retrieval_gate",
+        }
+
+    def _remember(
+        self,
+        question: str,
+        embedding: Optional[List[float]],
+        response: Dict[str, Any],
+    ):
+        if self.cache is not None and embedding is not None and response["answer"]:
+            self.cache.store(question, embedding, response)
+
+    @staticmethod
+    def _flight_key(question: str) -> Tuple[str, Optional[str]]:
+        return normalize_question(question), preferred_backend()
+
+    @staticmethod
+    def _joined(response: Dict[str, Any], question: str) -> Dict[str, Any]:
+        """
+        A coalesced caller's copy of the shared response.
+        """
+        COALESCED_REQUESTS.inc(mode="answer")
+        return dict(response, question=question)
+
+    def answer(self, question: str) -> Dict[str, Any]:
+        """
+        Generate an answer for the given question using RAG.
+        """
+        with stage("rag_answer"):
+            # Keyword-rule small talk needs no retrieval, LLM or coalescing
+            reply = self._small_talk(question)
+            if reply is not None:
+                return reply
+
+            if not self.coalesce:
+                return self._answer(question)
+
+            # Identical concurrent questions share one retrieval + generation
+            response, shared = self._flights.do(
+                self._flight_key(question), lambda: self._answer(question)
+            )
+            return self._joined(response, question) if shared else response
+
+    def _answer(self, question: str) -> Dict[str, Any]:
+        embedding, cached = self._lookup(question)
+        if cached is not None:
+            return cached
+
+        # Retrieve relevant documents; skip generation if none are
+        docs, score = self._retrieve(question, embedding)
+        gated = self._gate(question, docs, score)
+        if gated is not None:
+            return gated
+
+        # Build prompt (packed for whichever backend serves it)
+        prompt = self._prompt_for(question, docs)
+
         # Generate response (Ollama or HuggingFace fallback)
         answer, backend_used = generate_response(prompt)
 
-        return {
+        response = {
+            "question": question,
+            "answer": answer.strip(),
+            "sources": docs,
+            "backend": backend_used,
+        }
+        self._remember(question, embedding, response)
+        return response
+
+    async def aanswer(self, question: str) -> Dict[str, Any]:
+        """
+        Async variant of `answer` that never blocks the event loop.
+        """
+        with stage("rag_answer"):
+            reply = self._small_talk(question)
+            if reply is not None:
+                return reply
+
+            if not self.coalesce:
+                return await self._aanswer(question)
+
+            response, shared = await self._async_flights.do(
+                self._flight_key(question), lambda: self._aanswer(question)
+            )
+            return self._joined(response, question) if shared else response
+
+    async def _aanswer(self, question: str) -> Dict[str, Any]:
+        # Query embedding + FAISS search are CPU-bound
+        embedding, cached = await run_cpu(self._lookup, question)
+        if cached is not None:
+            return cached
+
+        docs, score = await run_cpu(self._retrieve, question, embedding)
+        gated = self._gate(question, docs, score)
+        if gated is not None:
+            return gated
+
+        prompt = self._prompt_for(question, docs)
+
+        answer, backend_used = await agenerate_response(prompt)
+
+        response = {
             "question": question,
             "answer": answer.strip(),
             "sources": docs,
             "backend": backend_used,
-        }
\ No newline at end of file
+        }
+        await run_io(self._remember, question, embedding, response)
+        return response
+
+    async def stream_answer(self, question: str) -> StreamingAnswer:
+        """
+        Retrieve, then start a streaming generation. Sources are available
+        immediately; tokens arrive as the backend produces them.
+
+        With coalescing, identical questions asked while a stream is in
+        flight subscribe to it (replaying the tokens produced so far)
+        instead of starting their own generation.
+
+        The "rag_answer" stage spans from here to the last token.
+        """
+        started = time.perf_counter()
+        try:
+            docs, tokens, backend_used = await self._start_stream(question)
+        except BaseException:
+            STAGE_LATENCY.observe(time.perf_counter() - started, stage="rag_answer")
+            raise
+        return StreamingAnswer(
+            question, docs, _spanned(tokens, started, "rag_answer"), backend_used
+        )
+
+    async def _start_stream(
+        self, question: str
+    ) -> Tuple[List[Document], AsyncIterator[str], str]:
+        reply = self._small_talk(question)
+        if reply is not None:
+            return [], _single(reply["answer"]), reply["backend"]
+
+        if not self.coalesce:
+            (docs, backend_used), tokens = await self._open_stream(question)
+            return docs, tokens, backend_used
+
+        stream, shared = self._streams.join(
+            self._flight_key(question), lambda: self._open_stream(question)
+        )
+        if shared:
+            COALESCED_REQUESTS.inc(mode="stream")
+
+        docs, backend_used = await stream.opened()
+        return docs, stream.subscribe(), backend_used
+
+    async def _open_stream(
+        self, question: str
+    ) -> Tuple[Tuple[List[Document], str], AsyncIterator[str]]:
+        embedding, cached = await run_cpu(self._lookup, question)
+        if cached is not None:
+            return (cached["sources"], cached["backend"]), _single(cached["answer"])
+
+        docs, score = await run_cpu(self._retrieve, question, embedding)
+        gated = self._gate(question, docs, score)
+        if gated is not None:
+            return (gated["sources"], gated["backend"]), _single(gated["answer"])
+
+        prompt = self._prompt_for(question, docs)
+
+        tokens, backend_used = await astream_response(prompt)
+
+        async def remembered() -> AsyncIterator[str]:
+            # Cache the answer once the stream has been fully produced
+            parts: List[str] = []
+            async for token in tokens:
+                parts.append(token)
+                yield token
+
+            response = {
+                "question": question,
+                "answer": "".join(parts).strip(),
+                "sources": docs,
+                "backend": backend_used,
+            }
+            await run_io(self._remember, question, embedding, response)
+
+        return (docs, backend_used), remembered()
+
+    # -----------------------------
+    # Offline batch answering
+    # -----------------------------
+    def answer_batch(
+        self,
+        questions: Sequence[str],
+        concurrency: int = config.BATCH_CONCURRENCY,
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many questions (regression suites, FAQ pre-answering,
+        audits). Responses come back in input order.
+
+        Repeated questions are answered once. The rest are embedded in one
+        forward pass and retrieved with one FAISS search; questions that
+        retrieve the same chunks share one packed context, and at most
+        `concurrency` generations run at a time. A question whose
+        generation fails gets an "error" instead of failing the batch.
+        """
+        with stage("rag_answer_batch"):
+            unique: Dict[str, str] = {}
+            for question in questions:
+                unique.setdefault(normalize_question(question), question)
+
+            responses: Dict[str, Dict[str, Any]] = {}
+            pending: List[Tuple[str, str]] = []
+            for key, question in unique.items():
+                reply = self._small_talk(question)
+                if reply is not None:
+                    responses[key] = reply
+                else:
+                    pending.append((key, question))
+
+            embeddings = self._embed_batch([question for _, question in pending])
+            to_retrieve = []
+            for (key, question), embedding in zip(pending, embeddings):
+                ready = (
+                    self._ready_response(question, embedding)
+                    if embedding is not None else None
+                )
+                if ready is not None:
+                    responses[key] = ready
+                else:
+                    to_retrieve.append((key, question, embedding))
+
+            retrieved = self._retrieve_batch(
+                [(question, embedding) for _, question, embedding in to_retrieve]
+            )
+            jobs = []
+            for (key, question, embedding), (docs, score) in zip(to_retrieve, retrieved):
+                gated = self._gate(question, docs, score)
+                if gated is not None:
+                    responses[key] = gated
+                else:
+                    jobs.append((key, question, embedding, docs))
+
+            prompt_for = self._shared_prompts()
+
+            def generate(job):
+                key, question, embedding, docs = job
+                try:
+                    answer, backend_used = generate_response(prompt_for(question, docs))
+                except Exception as e:
+                    return key, {
+                        "question": question,
+                        "answer": "",
+                        "sources": docs,
+                        "backend": None,
+                        "error": str(e),
+                    }
+
+                response = {
+                    "question": question,
+                    "answer": answer.strip(),
+                    "sources": docs,
+                    "backend": backend_used,
+                }
+                self._remember(question, embedding, response)
+                return key, response
+
+            if jobs:
+                with ThreadPoolExecutor(
+                    max_workers=max(1, concurrency), thread_name_prefix="rag-batch"
+                ) as pool:
+                    responses.update(pool.map(generate, jobs))
+
+        return [
+            dict(responses[normalize_question(question)], question=question)
+            for question in questions
+        ]
+
+    def _embed_batch(self, questions: List[str]) -> List[Optional[List[float]]]:
+        """
+        `_lookup`'s query embeddings for many questions in one forward
+        pass (None where lexical-only retrieval suffices).
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(questions)
+        needed = [
+            i for i, question in enumerate(questions)
+            if self.hybrid is None or self.hybrid.needs_embedding(question)
+        ]
+        if not needed:
+            return embeddings
+
+        texts = [questions[i] for i in needed]
+        with stage("query_embedding"):
+            service = getattr(self.vectorstore.embeddings, "service", None)
+            if service is not None:
+                vectors = service.encode_queries(texts).tolist()
+            else:
+                vectors = [self.vectorstore.embeddings.embed_query(t) for t in texts]
+
+        for i, vector in zip(needed, vectors):
+            embeddings[i] = vector
+        return embeddings
+
+    def _retrieve_batch(
+        self, queries: List[Tuple[str, Optional[List[float]]]]
+    ) -> List[Tuple[List[Document], Optional[float]]]:
+        """
+        `_retrieve` for many (question, embedding) pairs, with one FAISS
+        search for all the embedded ones.
+        """
+        results: List[Tuple[List[Document], Optional[float]]] = [([], None)] * len(queries)
+        dense = [i for i, (_, embedding) in enumerate(queries) if embedding is not None]
+
+        with stage("retrieval"):
+            if dense:
+                vectors = np.asarray([queries[i][1] for i in dense], dtype="float32")
+                if self.hybrid is not None:
+                    found = self.hybrid.search_batch(
+                        [queries[i][0] for i in dense], vectors
+                    )
+                else:
+                    found = [
+                        ([doc for doc, _ in scored],
+                         similarity(scored[0][1]) if scored else None)
+                        for scored in search_batch(self.vectorstore, vectors, config.TOP_K)
+                    ]
+                for i, result in zip(dense, found):
+                    results[i] = result
+
+            for i, (question, embedding) in enumerate(queries):
+                if embedding is None:
+                    results[i] = self.hybrid.search_with_score(question, None)
+
+        for _, score in results:
+            if score is not None:
+                RETRIEVAL_SCORE.observe(score)
+        return results
+
+    def _shared_prompts(self) -> Callable[[str, List[Document]], Callable[[str], str]]:
+        """
+        `_prompt_for` whose merged contexts are shared: chunks retrieved
+        by several questions are merged and counted once per backend. A
+        question whose prompt leaves too little room is packed on its own.
+        """
+        merged: Dict[Tuple, Tuple[str, int]] = {}
+
+        def prompt_for(question: str, docs: List[Document]) -> Callable[[str], str]:
+            chunk_ids = tuple(doc.metadata.get("chunk_id", doc.page_content) for doc in docs)
+
+            def build(backend: str) -> str:
+                with stage("prompt_build"):
+                    count_tokens = get_token_counter(backend)
+                    key = (chunk_ids, backend)
+                    if key not in merged:
+                        spans = self.packer.merge(docs)
+                        # Same cost the packer adds up span by span
+                        cost = sum(count_tokens(span) for span in spans) + (
+                            count_tokens(self.packer.separator) * max(0, len(spans) - 1)
+                        )
+                        merged[key] = (self.packer.separator.join(spans), cost)
+
+                    context, cost = merged[key]
+                    reserved = count_tokens(self._render_prompt(question, ""))
+                    if cost > context_budget(backend) - reserved:
+                        context = self._build_context(docs, backend, reserved)
+                    return self._render_prompt(question, context)
+
+            return build
+
+        return prompt_for
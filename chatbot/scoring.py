@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from nltk.stem import porter
+
+# -----------------------------
+# Native ROUGE-L / BLEU
+# -----------------------------
+# Same definitions as rouge_score (rougeL, use_stemmer=True) and NLTK
+# sentence_bleu (uniform 4-gram weights, smoothing method1), without
+# their per-call overhead:
+# - LCS is bit-parallel, so a long reference (all retrieved chunks
+#   concatenated) costs len(answer) big-int operations, not a
+#   len(answer) x len(reference) Python table;
+# - stems, token lists, LCS match masks and reference n-gram counts are
+#   cached, so a reference shared by many answers is prepared once.
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_stemmer = porter.PorterStemmer()
+
+BLEU_MAX_N = 4
+# SmoothingFunction().method1: epsilon counts for n-gram orders with no match
+BLEU_EPSILON = 0.1
+
+
+@lru_cache(maxsize=65536)
+def _stem(token: str) -> str:
+    # rouge_score only stems words longer than 3 characters
+    return _stemmer.stem(token) if len(token) > 3 else token
+
+
+@lru_cache(maxsize=1024)
+def rouge_tokens(text: str) -> Tuple[str, ...]:
+    """
+    rouge_score's tokenisation: lowercase, alphanumeric runs, Porter stems.
+    """
+    return tuple(_stem(t) for t in _NON_ALNUM_RE.sub(" ", text.lower()).split())
+
+
+@lru_cache(maxsize=1024)
+def bleu_tokens(text: str) -> Tuple[str, ...]:
+    """
+    BLEU tokenisation used by the evaluator (whitespace split, as cased).
+    """
+    return tuple(text.split())
+
+
+@lru_cache(maxsize=256)
+def _match_masks(tokens: Tuple[str, ...]) -> Dict[str, int]:
+    """
+    For each distinct token, a bitmask of the positions where it occurs.
+    """
+    masks: Dict[str, int] = {}
+    for position, token in enumerate(tokens):
+        masks[token] = masks.get(token, 0) | (1 << position)
+    return masks
+
+
+def lcs_length(a: Sequence[str], b: Tuple[str, ...]) -> int:
+    """
+    Length of the longest common subsequence of two token sequences.
+
+    Bit-parallel over `b` (Allison-Dix / Hyyrö): one pass over `a`,
+    each step a few operations on a len(b)-bit integer.
+    """
+    if not a or not b:
+        return 0
+
+    masks = _match_masks(b)
+    full = (1 << len(b)) - 1
+    v = full
+    for token in a:
+        match = masks.get(token)
+        if match is None:
+            continue
+        u = v & match
+        v = ((v + u) | (v - u)) & full
+
+    # Zero bits of v mark the positions that extend the LCS
+    return len(b) - bin(v).count("1")
+
+
+def rouge_l_f1(answer: str, reference: str) -> float:
+    prediction = rouge_tokens(answer)
+    target = rouge_tokens(reference)
+    if not prediction or not target:
+        return 0.0
+
+    lcs = lcs_length(prediction, target)
+    precision = lcs / len(prediction)
+    recall = lcs / len(target)
+    if precision + recall == 0:
+        return 0.0
+    return 2 * precision * recall / (precision + recall)
+
+
+def _ngrams(tokens: Sequence[str], n: int) -> Counter:
+    return Counter(zip(*(tokens[i:] for i in range(n))))
+
+
+@lru_cache(maxsize=256)
+def _reference_ngrams(tokens: Tuple[str, ...]) -> Tuple[Counter, ...]:
+    return tuple(_ngrams(tokens, n) for n in range(1, BLEU_MAX_N + 1))
+
+
+def bleu(answer: str, reference: str) -> float:
+    """
+    Sentence BLEU of `answer` against a single `reference`.
+    """
+    hypothesis = bleu_tokens(answer)
+    ref = bleu_tokens(reference)
+    if not hypothesis:
+        return 0.0
+
+    reference_counts = _reference_ngrams(ref)
+    log_precision = 0.0
+    for n in range(1, BLEU_MAX_N + 1):
+        counts = _ngrams(hypothesis, n)
+        total = max(1, len(hypothesis) - n + 1)
+        matched = sum(
+            min(count, reference_counts[n - 1].get(ngram, 0))
+            for ngram, count in counts.items()
+        )
+        if matched == 0 and n == 1:
+            return 0.0
+        precision = matched / total if matched else BLEU_EPSILON / total
+        log_precision += math.log(precision) / BLEU_MAX_N
+
+    c, r = len(hypothesis), len(ref)
+    brevity = 1.0 if c > r else math.exp(1 - r / c)
+    return brevity * math.exp(log_precision)
+
+
+def score(answer: str, reference: str) -> Dict[str, float]:
+    return {
+        "rougeL_f1": rouge_l_f1(answer, reference),
+        "bleu": bleu(answer, reference),
+    }
+
+
+def score_batch(pairs: Iterable[Tuple[str, str]]) -> List[Dict[str, float]]:
+    """
+    Score many (answer, reference) pairs. Pairs sharing a reference are
+    scored back to back so its tokens, masks and n-grams stay cached.
+    """
+    pairs = list(pairs)
+    order = sorted(range(len(pairs)), key=lambda i: hash(pairs[i][1]))
+    results: List[Dict[str, float]] = [{} for _ in pairs]
+    for i in order:
+        results[i] = score(*pairs[i])
+    return results
@@ -0,0 +1,228 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from chatbot.config import config
+
+
+def serialize_sources(docs: List[Document]) -> List[Dict[str, Any]]:
+    return [
+        {"page_content": doc.page_content, "metadata": doc.metadata}
+        for doc in docs
+    ]
+
+
+def deserialize_sources(items: List[Dict[str, Any]]) -> List[Document]:
+    return [
+        Document(page_content=item["page_content"], metadata=item["metadata"])
+        for item in items
+    ]
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on the question embedding.
+
+    A lookup returns a stored response when the cosine similarity between
+    the new question and a cached one reaches `threshold`. Entries expire
+    after `ttl` seconds and the least recently used ones are evicted once
+    `max_entries` is exceeded. Everything persists in SQLite; the whole
+    cache is dropped when the vectorstore `fingerprint` changes.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        path: Path = config.SEMANTIC_CACHE_PATH,
+        threshold: float = config.SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = config.SEMANTIC_CACHE_TTL,
+        max_entries: int = config.SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        # Rows [0, _size) of the preallocated buffers are live, in
+        # insertion (and so creation-time) order
+        self._ids: List[int] = []
+        self._matrix = np.zeros((0, 0), dtype="float32")
+        self._created = np.zeros(0, dtype="float64")
+        self._size = 0
+
+        self._create_tables()
+        self._load()
+
+    def _create_tables(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT,
+                embedding BLOB,
+                response TEXT,
+                created_at REAL,
+                last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_semantic_cache_last_used
+                ON semantic_cache (last_used);
+        """)
+        self.conn.commit()
+
+    def _load(self):
+        row = self.conn.execute(
+            "SELECT value FROM cache_meta WHERE key = 'fingerprint'"
+        ).fetchone()
+
+        if row is None or row[0] != self.fingerprint:
+            # Vectorstore contents changed: cached answers may be stale
+            self.conn.execute("DELETE FROM semantic_cache")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_meta VALUES ('fingerprint', ?)",
+                (self.fingerprint,),
+            )
+            self.conn.commit()
+
+        rows = self.conn.execute(
+            "SELECT id, embedding, created_at FROM semantic_cache ORDER BY id"
+        ).fetchall()
+
+        self._ids = [r[0] for r in rows]
+        self._set_rows(
+            np.vstack([np.frombuffer(r[1], dtype="float32") for r in rows])
+            if rows else np.zeros((0, 0), dtype="float32"),
+            np.array([r[2] for r in rows], dtype="float64"),
+        )
+
+    def _set_rows(self, matrix: np.ndarray, created: np.ndarray):
+        """
+        Replace the in-memory rows, leaving room to append.
+        """
+        self._size = len(created)
+        capacity = max(16, 2 * self._size)
+        self._matrix = np.zeros((capacity, matrix.shape[1]), dtype="float32")
+        self._matrix[:self._size] = matrix
+        self._created = np.zeros(capacity, dtype="float64")
+        self._created[:self._size] = created
+
+    def _append(self, vector: np.ndarray, created: float):
+        if self._matrix.shape[1] != len(vector):
+            # First entry fixes the dimension
+            self._matrix = np.zeros((len(self._created), len(vector)), dtype="float32")
+        if self._size == len(self._created):
+            # Grow geometrically: appends stay amortised O(1)
+            self._set_rows(self._matrix[:self._size], self._created[:self._size])
+        self._matrix[self._size] = vector
+        self._created[self._size] = created
+        self._size += 1
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype="float32").ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response closest to `embedding`, or None.
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if not self._ids:
+                return None
+
+            scores = self._matrix[:self._size] @ query
+            now = time.time()
+            expired = self._created[:self._size] < now - self.ttl
+            scores[expired] = -1.0
+
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            entry_id = self._ids[best]
+            row = self.conn.execute(
+                "SELECT response FROM semantic_cache WHERE id = ?",
+                (entry_id,),
+            ).fetchone()
+            self.conn.execute(
+                "UPDATE semantic_cache SET last_used = ? WHERE id = ?",
+                (now, entry_id),
+            )
+            self.conn.commit()
+
+        if row is None:
+            return None
+
+        response = json.loads(row[0])
+        response["sources"] = deserialize_sources(response["sources"])
+        return response
+
+    def store(self, question: str, embedding, response: Dict[str, Any]):
+        """
+        Cache a response produced for `question`.
+        """
+        vector = self._normalize(embedding)
+        payload = dict(response)
+        payload["sources"] = serialize_sources(response.get("sources", []))
+        now = time.time()
+
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO semantic_cache VALUES (NULL, ?, ?, ?, ?, ?)",
+                (question, vector.tobytes(), json.dumps(payload), now, now),
+            )
+            self._ids.append(cursor.lastrowid)
+            self._append(vector, now)
+            # Only when over capacity or the oldest entry has expired
+            if self._size > self.max_entries or self._created[0] < now - self.ttl:
+                self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        """
+        Drop expired entries, then least recently used ones down to 90%
+        of `max_entries`, so the next eviction is many inserts away.
+        """
+        self.conn.execute(
+            "DELETE FROM semantic_cache WHERE created_at < ?",
+            (now - self.ttl,),
+        )
+        self.conn.execute(
+            """
+            DELETE FROM semantic_cache WHERE id IN (
+                SELECT id FROM semantic_cache
+                ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (max(1, int(self.max_entries * 0.9)),),
+        )
+
+        remaining = {
+            r[0] for r in self.conn.execute("SELECT id FROM semantic_cache")
+        }
+        if len(remaining) != len(self._ids):
+            keep = [i for i, eid in enumerate(self._ids) if eid in remaining]
+            self._ids = [self._ids[i] for i in keep]
+            self._set_rows(self._matrix[keep], self._created[keep])
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM semantic_cache")
+            self.conn.commit()
+            self._ids = []
+            self._set_rows(np.zeros((0, 0), dtype="float32"), np.zeros(0))
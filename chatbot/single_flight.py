@@ -0,0 +1,191 @@
+import asyncio
+import re
+import threading
+from concurrent.futures import Future
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Coalescing key for a question: case, spacing and trailing
+    punctuation don't make two questions different.
+    """
+    return _SPACE_RE.sub(" ", question).strip().rstrip("?!.").strip().lower()
+
+
+class SingleFlight:
+    """
+    Thread-side single flight: concurrent calls with the same key run
+    `fn` once; the others block and receive the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Returns `(result, shared)`; `shared` is True for joined calls.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Event-loop single flight. The work runs as its own task, so a
+    caller that is cancelled (client gone) doesn't fail the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[T]]
+    ) -> Tuple[T, bool]:
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+class BroadcastStream:
+    """
+    One token stream, fanned out to any number of subscribers.
+
+    `open_stream` returns `(info, tokens)`. A background task drains
+    `tokens` at the producer's pace and buffers them; every subscriber
+    replays the buffer from the start, so late joiners get the full
+    answer. A slow or vanished subscriber never stalls the others.
+    """
+
+    def __init__(
+        self, open_stream: Callable[[], Awaitable[Tuple[Any, AsyncIterator[str]]]]
+    ):
+        self._tokens: List[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self._opened: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.ensure_future(self._run(open_stream))
+
+    async def _run(self, open_stream):
+        try:
+            info, tokens = await open_stream()
+        except BaseException as e:
+            self._opened.set_exception(e)
+            # Retrieved by subscribers; don't warn if nobody is left
+            self._opened.exception()
+            self._finish()
+            return
+
+        self._opened.set_result(info)
+        try:
+            async for token in tokens:
+                self._tokens.append(token)
+                self._wake()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._finish()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _finish(self):
+        self._done = True
+        self._wake()
+
+    def add_done_callback(self, callback: Callable[["BroadcastStream"], None]):
+        self._task.add_done_callback(lambda _: callback(self))
+
+    async def opened(self) -> Any:
+        """
+        Wait for the stream to start; returns the opener's `info`.
+        """
+        return await asyncio.shield(self._opened)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self._tokens):
+                yield self._tokens[position]
+                position += 1
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+                return
+            await self._changed.wait()
+
+
+class StreamFlights:
+    """
+    Single flight for streams: a key stays joinable until its stream has
+    finished, not just until it has started.
+    """
+
+    def __init__(self):
+        self._streams: Dict[Hashable, BroadcastStream] = {}
+
+    def join(
+        self,
+        key: Hashable,
+        open_stream: Callable[[], Awaitable[Tuple[Any, AsyncIterator[str]]]],
+    ) -> Tuple[BroadcastStream, bool]:
+        """
+        Returns `(stream, shared)`; `shared` is True when joining an
+        in-flight stream.
+        """
+        stream = self._streams.get(key)
+        if stream is not None:
+            return stream, True
+
+        stream = self._streams[key] = BroadcastStream(open_stream)
+        stream.add_done_callback(lambda s: self._forget(key, s))
+        return stream, False
+
+    def _forget(self, key: Hashable, stream: BroadcastStream):
+        if self._streams.get(key) is stream:
+            del self._streams[key]
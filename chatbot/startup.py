@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from chatbot.config import config
+
+
+class StartupReport:
+    """
+    Records how long each startup step takes, including steps running in
+    background threads, and writes a JSON report.
+    """
+
+    def __init__(self, path: Path = config.STARTUP_REPORT_PATH):
+        self.path = Path(path)
+        self.started = time.perf_counter()
+        self.steps: List[Dict] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, start: float, background: bool, error: str = None):
+        with self._lock:
+            self.steps.append({
+                "step": name,
+                "seconds": round(time.perf_counter() - start, 4),
+                "background": background,
+                "error": error,
+            })
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Time a blocking startup step.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, background=False)
+
+    def background(self, name: str, fn: Callable, *args):
+        """
+        Run a startup step in a daemon thread. Failures are recorded, not
+        raised: background steps are optional by design.
+        """
+        def run():
+            start = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception as e:
+                self._record(name, start, background=True, error=str(e))
+            else:
+                self._record(name, start, background=True)
+
+        thread = threading.Thread(target=run, name=f"startup-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return thread
+
+    def ready(self):
+        """
+        Mark the app as ready to serve and write the report. Background
+        steps still running are written again when they finish.
+        """
+        self.ready_seconds = round(time.perf_counter() - self.started, 4)
+        print(f"🚀 Ready in {self.ready_seconds:.2f}s")
+        for entry in self.steps:
+            print(f"   - {entry['step']}: {entry['seconds']:.2f}s")
+        self.save()
+
+        pending = [t for t in self._threads if t.is_alive()]
+        if pending:
+            def save_when_done():
+                for thread in pending:
+                    thread.join()
+                self.save()
+
+            threading.Thread(target=save_when_done, daemon=True).start()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            steps = list(self.steps)
+        self.path.write_text(
+            json.dumps(
+                {
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "ready_seconds": getattr(self, "ready_seconds", None),
+                    "steps": steps,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
@@ -1,40 +1,261 @@
 from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+
+from chatbot.config import config
+from chatbot.chunk_store import ChunkStore, open_vectorstore, save_vectorstore
+from chatbot.embeddings import get_embeddings
+from chatbot.faiss_index import build_index, index_spec, needs_training, remove_vectors
+from chatbot.lexical_index import LexicalIndex
+from chatbot.manifest import IndexManifest, assign_chunk_ids, content_hash
+
+
+VECTORSTORE_PATH = Path(config.VECTORSTORE_DIR)
+# Pickled docstore written by FAISS.save_local before chunk_store existed
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+
+class _IndexWriter:
+    """
+    Embeds chunk batches and adds them to a vectorstore, opening or
+    creating it on the first batch that has anything to add.
+
+    A fresh IVF index is built only once FAISS_TRAIN_SAMPLE vectors (or
+    the whole corpus, if smaller) are buffered to train it on.
+    """
+
+    def __init__(self, embedding, open_existing: Optional[Callable[[], FAISS]] = None):
+        self.embedding = embedding
+        self.open_existing = open_existing
+        self.vectorstore: Optional[FAISS] = None
+        self.added = 0
+        self._pending = []
+        self._pending_count = 0
+
+    def add(self, chunks: List[Document]):
+        if not chunks:
+            return
+        vectors = self.embedding.service.encode_documents(
+            [chunk.page_content for chunk in chunks]
+        )
+
+        if self.vectorstore is None and self.open_existing is not None:
+            self.vectorstore = self.open_existing()
+        if self.vectorstore is not None:
+            self._add(chunks, vectors)
+            return
 
+        self._pending.append((chunks, vectors))
+        self._pending_count += len(chunks)
+        if not needs_training() or self._pending_count >= config.FAISS_TRAIN_SAMPLE:
+            self._create()
 
-VECTORSTORE_PATH = Path("storage/vectorstore")
+    def finish(self) -> FAISS:
+        """
+        Flush buffered vectors; returns the (possibly unchanged) vectorstore.
+        """
+        if self.vectorstore is None and self._pending:
+            self._create()
+        if self.vectorstore is None and self.open_existing is not None:
+            self.vectorstore = self.open_existing()
+        return self.vectorstore
+
+    def _create(self):
+        # Index type from config (FAISS_INDEX_TYPE), trained on the buffer
+        sample = np.vstack([vectors for _, vectors in self._pending])
+        self.vectorstore = FAISS(
+            embedding_function=self.embedding,
+            index=build_index(sample),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        pending, self._pending = self._pending, []
+        for chunks, vectors in pending:
+            self._add(chunks, vectors)
+
+    def _add(self, chunks: List[Document], vectors: np.ndarray):
+        self.vectorstore.add_embeddings(
+            zip([chunk.page_content for chunk in chunks], vectors.tolist()),
+            metadatas=[chunk.metadata for chunk in chunks],
+            ids=[chunk.metadata["chunk_id"] for chunk in chunks],
+        )
+        self.added += len(chunks)
 
 
 class VectorStoreManager:
     def __init__(self):
-        self.embedding = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Shared, lazily loaded model (see chatbot.embeddings)
+        self.embedding = get_embeddings(config.EMBEDDING_MODEL)
+        # Manifest of the index currently served (set by get_or_create)
+        self.manifest = None
+        # BM25 index over the same chunks, persisted next to FAISS
+        self.lexical_index = None
 
     def get_or_create(self, documents):
-        if VECTORSTORE_PATH.exists():
+        """
+        Load the persisted index and bring it in line with `documents`
+        (already chunked; see `ingest` for the streaming version).
+        """
+        assign_chunk_ids(documents)
+        size = config.INGEST_BATCH_SIZE
+        return self.ingest(
+            documents[i:i + size] for i in range(0, len(documents), size)
+        )
+
+    def ingest(self, batches: Iterable[List[Document]]):
+        """
+        Bring the persisted index in line with a stream of chunk batches
+        (ids assigned), e.g. `IngestionPipeline.iter_batches()`.
+
+        Batches are embedded and added as they arrive, so the corpus is
+        never held in memory twice. Only chunks whose content hash is new
+        get embedded; chunks that no longer exist are deleted at the end.
+        A full rebuild happens when there is no manifest or the embedding
+        model / chunking / index settings changed.
+        """
+        manifest = IndexManifest(
+            config.EMBEDDING_MODEL,
+            config.CHUNK_SIZE,
+            config.CHUNK_OVERLAP,
+            {},
+            faiss_index=index_spec(),
+        )
+        previous = IndexManifest.load(VECTORSTORE_PATH)
+        reuse = (
+            VECTORSTORE_PATH.exists()
+            and previous is not None
+            and previous.settings_match(manifest)
+        )
+        known = set()
+        if reuse:
             try:
-                return self.load_vectorstore()
+                # Cheap (memory-mapped) check that the saved index is usable.
+                # Its own ids, not the manifest's, say what is already
+                # embedded: the store is written first, so a crash in
+                # between leaves the manifest behind
+                known = set(self.load_vectorstore().index_to_docstore_id.values())
             except Exception as e:
                 print("⚠️ Failed to load existing vectorstore. Rebuilding...")
                 print(e)
-                return self.create_vectorstore(documents)
-        else:
-            return self.create_vectorstore(documents)
+                reuse = False
+        writer = _IndexWriter(
+            self.embedding,
+            # Loaded into memory only once there is something to change
+            open_existing=(lambda: self.load_vectorstore(writable=True)) if reuse else None,
+        )
+
+        for batch in batches:
+            manifest.add_chunks(batch)
+            writer.add([c for c in batch if c.metadata["chunk_id"] not in known])
+
+        current = set(manifest.chunk_ids())
+        if not current:
+            raise ValueError("No chunks to index.")
+        removed = [cid for cid in known if cid not in current]
+
+        if reuse and not writer.added and not removed:
+            # Nothing to change: serve the memory-mapped index
+            vectorstore = self.load_vectorstore()
+            self._load_lexical_index(vectorstore)
+            if manifest.files != previous.files:
+                manifest.save(VECTORSTORE_PATH)
+            self.manifest = manifest
+            return vectorstore
+
+        vectorstore = writer.finish()
+        if removed:
+            remove_vectors(vectorstore, removed)
+
+        if reuse:
+            print(
+                f"🔄 Vectorstore updated: {writer.added} chunks embedded, "
+                f"{len(removed)} removed"
+            )
+        self._save(vectorstore, manifest)
+        return vectorstore
 
-    def create_vectorstore(self, documents):
-        vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embedding,
+    def manifest_is_current(self, data_dir: Path = config.DATA_DIR) -> bool:
+        """
+        True when the saved index was built from exactly the files now in
+        `data_dir` with the current settings, so loading and chunking the
+        documents can be skipped entirely.
+        """
+        previous = IndexManifest.load(VECTORSTORE_PATH)
+        expected = IndexManifest(
+            config.EMBEDDING_MODEL,
+            config.CHUNK_SIZE,
+            config.CHUNK_OVERLAP,
+            {},
+            faiss_index=index_spec(),
         )
-        VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
-        vectorstore.save_local(VECTORSTORE_PATH)
+        if previous is None or not previous.settings_match(expected):
+            return False
+
+        current = {}
+        for path in Path(data_dir).iterdir():
+            if path.suffix.lower() != ".txt":
+                continue
+            text = path.read_text(encoding="utf-8")
+            # Blank files yield no chunks, so the manifest never lists them
+            if text.strip():
+                current[path.name] = content_hash(text)
+        return current == {
+            name: entry["hash"] for name, entry in previous.files.items()
+        }
+
+    def load_current(self):
+        """
+        Load the saved index as-is (see `manifest_is_current`).
+        """
+        vectorstore = self.load_vectorstore()
+        self.manifest = IndexManifest.load(VECTORSTORE_PATH)
+        self._load_lexical_index(vectorstore)
         return vectorstore
 
-    def load_vectorstore(self):
-        return FAISS.load_local(
+    def load_vectorstore(self, writable: bool = False):
+        """
+        Open the persisted index, memory-mapped and read-only unless
+        `writable` (see chatbot.chunk_store).
+        """
+        if not ChunkStore.exists(VECTORSTORE_PATH):
+            return self._convert_legacy()
+        return open_vectorstore(VECTORSTORE_PATH, self.embedding, writable=writable)
+
+    def _convert_legacy(self):
+        """
+        Load an index saved by `FAISS.save_local` (pickled docstore) once
+        and rewrite it in the memory-mapped format.
+        """
+        vectorstore = FAISS.load_local(
             VECTORSTORE_PATH,
             embeddings=self.embedding,
             allow_dangerous_deserialization=True,
         )
+        save_vectorstore(vectorstore, VECTORSTORE_PATH)
+        (VECTORSTORE_PATH / LEGACY_DOCSTORE_FILE).unlink(missing_ok=True)
+        print("🔄 Vectorstore converted to the memory-mapped format")
+        return vectorstore
+
+    def _save(self, vectorstore, manifest):
+        VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+        save_vectorstore(vectorstore, VECTORSTORE_PATH)
+        (VECTORSTORE_PATH / LEGACY_DOCSTORE_FILE).unlink(missing_ok=True)
+        self.lexical_index = LexicalIndex.from_vectorstore(vectorstore)
+        self.lexical_index.save(VECTORSTORE_PATH)
+        manifest.save(VECTORSTORE_PATH)
+        self.manifest = manifest
+
+    def _load_lexical_index(self, vectorstore):
+        """
+        Load the persisted BM25 index; build it for indexes saved before
+        it existed.
+        """
+        lexical_index = LexicalIndex.load(VECTORSTORE_PATH)
+        if lexical_index is None or len(lexical_index) != vectorstore.index.ntotal:
+            lexical_index = LexicalIndex.from_vectorstore(vectorstore)
+            lexical_index.save(VECTORSTORE_PATH)
+        self.lexical_index = lexical_index
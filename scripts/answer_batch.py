@@ -0,0 +1,126 @@
+"""
+Answer a JSONL file of questions with HRPolicyRAG.answer_batch.
+
+Usage:
+    python scripts/answer_batch.py questions.jsonl answers.jsonl
+    python scripts/answer_batch.py questions.jsonl answers.jsonl --concurrency 8 --use-cache
+
+Each input line is {"question": ...} (other fields are copied to the
+output) or a bare JSON string. Each output line adds the answer, the
+serving backend, the sources (chunk id and file), an "error" when the
+generation failed, and the batch's mean seconds per question. Questions
+are answered --chunk-size at a time, so output appears as the run goes.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from chatbot.config import config  # noqa: E402
+
+
+def read_questions(path: Path) -> Iterator[Dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            yield row if isinstance(row, dict) else {"question": row}
+
+
+def chunked(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_rag(use_cache: bool):
+    from chatbot.ingestion import IngestionPipeline
+    from chatbot.rag_chain import HRPolicyRAG
+    from chatbot.semantic_cache import SemanticCache
+    from chatbot.vectorstore import VectorStoreManager
+
+    manager = VectorStoreManager()
+    if manager.manifest_is_current():
+        vectorstore = manager.load_current()
+    else:
+        vectorstore = manager.ingest(IngestionPipeline().iter_batches())
+
+    cache = (
+        SemanticCache(fingerprint=manager.manifest.fingerprint())
+        if use_cache and config.SEMANTIC_CACHE_ENABLED else None
+    )
+    return HRPolicyRAG(
+        vectorstore,
+        cache=cache,
+        lexical_index=manager.lexical_index if config.HYBRID_RETRIEVAL else None,
+    )
+
+
+def to_row(row: Dict, response: Dict, latency: float) -> Dict:
+    return {
+        **row,
+        "answer": response["answer"],
+        "backend": response["backend"],
+        "sources": [
+            {
+                "chunk_id": doc.metadata.get("chunk_id"),
+                "source": doc.metadata.get("source"),
+            }
+            for doc in response["sources"]
+        ],
+        "error": response.get("error"),
+        "latency": round(latency, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY,
+                        help="generations in flight at once")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="questions per answer_batch call")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="read and fill the semantic answer cache")
+    args = parser.parse_args()
+
+    rag = build_rag(args.use_cache)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    total = errors = 0
+    start = time.perf_counter()
+    with open(args.output, "w", encoding="utf-8") as out:
+        for rows in chunked(read_questions(args.input), args.chunk_size):
+            chunk_start = time.perf_counter()
+            responses = rag.answer_batch(
+                [row["question"] for row in rows], concurrency=args.concurrency
+            )
+            latency = (time.perf_counter() - chunk_start) / len(rows)
+
+            for row, response in zip(rows, responses):
+                out.write(json.dumps(to_row(row, response, latency), ensure_ascii=False) + "\n")
+                errors += response.get("error") is not None
+            out.flush()
+
+            total += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"📝 {total} questions answered in {elapsed:.1f}s ({errors} errors)")
+
+    print(f"✅ Answers written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Pick RETRIEVAL_MIN_SCORE from a labelled question set.
+
+Usage:
+    python scripts/calibrate_retrieval_gate.py
+    python scripts/calibrate_retrieval_gate.py --questions labelled.jsonl --max-false-reject 0.01
+
+Input is JSONL, one {"question": ..., "in_scope": true|false} per line
+(default: the sample set next to this script). Each question is scored
+as HRPolicyRAG scores it: best dense similarity against the current
+index (chatbot.faiss_index.similarity). The suggested threshold is the
+highest one that gates at most --max-false-reject of the in-scope
+questions; the report shows how many off-topic questions it catches.
+"""
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from chatbot.faiss_index import similarity  # noqa: E402
+
+DEFAULT_QUESTIONS = Path(__file__).resolve().parent / "retrieval_gate_questions.jsonl"
+
+
+def load_labelled(path: Path) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [{"question": r["question"], "in_scope": bool(r["in_scope"])} for r in rows]
+
+
+def load_vectorstore():
+    from chatbot.ingestion import IngestionPipeline
+    from chatbot.vectorstore import VectorStoreManager
+
+    manager = VectorStoreManager()
+    if manager.manifest_is_current():
+        return manager, manager.load_current()
+    return manager, manager.ingest(IngestionPipeline().iter_batches())
+
+
+def score_questions(manager, vectorstore, questions: List[str]) -> np.ndarray:
+    """
+    Best dense similarity per question (one batched encode + search).
+    """
+    vectors = manager.embedding.service.encode_queries(questions)
+    distances, _ = vectorstore.index.search(
+        np.ascontiguousarray(vectors, dtype="float32"), 1
+    )
+    return np.array([similarity(d) for d in distances[:, 0]])
+
+
+def pick_threshold(in_scope: np.ndarray, max_false_reject: float) -> float:
+    """
+    Highest threshold with at most `max_false_reject` of the in-scope
+    scores strictly below it (the gate rejects score < threshold).
+    """
+    ordered = np.sort(in_scope)
+    allowed = int(np.floor(max_false_reject * len(ordered)))
+    return float(ordered[min(allowed, len(ordered) - 1)])
+
+
+def rates(scores: np.ndarray, labels: np.ndarray, threshold: float) -> Dict[str, float]:
+    gated = scores < threshold
+    return {
+        "false_reject": float(gated[labels].mean()),
+        "off_topic_caught": float(gated[~labels].mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--max-false-reject", type=float, default=0.0,
+                        help="share of in-scope questions the gate may reject")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="also write the scores and the result as JSON")
+    args = parser.parse_args()
+
+    rows = load_labelled(args.questions)
+    labels = np.array([r["in_scope"] for r in rows])
+    if labels.all() or not labels.any():
+        parser.error("the question set needs both in-scope and off-topic questions")
+
+    manager, vectorstore = load_vectorstore()
+    scores = score_questions(manager, vectorstore, [r["question"] for r in rows])
+
+    for name, mask in (("in-scope", labels), ("off-topic", ~labels)):
+        s = scores[mask]
+        print(
+            f"{name:<10} n={mask.sum():<4} min={s.min():.3f} "
+            f"median={np.median(s):.3f} max={s.max():.3f}"
+        )
+
+    print(f"\n{'threshold':>9} {'false_reject':>13} {'off_topic_caught':>17}")
+    for threshold in np.arange(0.1, 0.75, 0.05):
+        r = rates(scores, labels, threshold)
+        print(f"{threshold:>9.2f} {r['false_reject']:>13.1%} {r['off_topic_caught']:>17.1%}")
+
+    # Round down: rounding up could gate the in-scope question it was picked at
+    threshold = math.floor(pick_threshold(scores[labels], args.max_false_reject) * 1000) / 1000
+    result = {"threshold": threshold, **rates(scores, labels, threshold)}
+    print(
+        f"\nSuggested RETRIEVAL_MIN_SCORE = {result['threshold']} "
+        f"(rejects {result['false_reject']:.1%} of in-scope, "
+        f"catches {result['off_topic_caught']:.1%} of off-topic)"
+    )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps({
+            **result,
+            "scores": [
+                {**row, "score": round(float(score), 4)}
+                for row, score in zip(rows, scores)
+            ],
+        }, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()